@@ -0,0 +1,109 @@
+import gzip
+import json
+
+from sqlalchemy import null
+
+from exporter import json_value
+from models import Artist, Show, Venue
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Fields of each resource of the JSON API, and the columns they are projected from.
+# Rows are serialized from the attribute each column is labelled with, so that shows
+# and the occurrences of show series, which are not stored, serialize alike.
+VENUE_FIELDS = {
+    "id": Venue.id,
+    "name": Venue.name,
+    "genres": Venue.genres,
+    "address": Venue.address,
+    "city": Venue.city,
+    "state": Venue.state,
+    "phone": Venue.phone,
+    "website_link": Venue.website_link,
+    "facebook_link": Venue.facebook_link,
+    "image_link": Venue.image_link,
+    "seeking_talent": Venue.seeking_talent,
+    "seeking_description": Venue.seeking_description,
+    "upcoming_shows_count": Venue.upcoming_shows_count,
+    "past_shows_count": Venue.past_shows_count,
+}
+
+ARTIST_FIELDS = {
+    "id": Artist.id,
+    "name": Artist.name,
+    "genres": Artist.genres,
+    "city": Artist.city,
+    "state": Artist.state,
+    "phone": Artist.phone,
+    "website_link": Artist.website_link,
+    "facebook_link": Artist.facebook_link,
+    "image_link": Artist.image_link,
+    "seeking_venue": Artist.seeking_venue,
+    "seeking_description": Artist.seeking_description,
+    "upcoming_shows_count": Artist.upcoming_shows_count,
+    "past_shows_count": Artist.past_shows_count,
+}
+
+SHOW_FIELDS = {
+    "id": Show.id.label("show_id"),
+    # Only occurrences of a show series have a series id, and they have no id
+    "series_id": null().label("series_id"),
+    "start_time": Show.start_time,
+    "duration": Show.duration,
+    "artist_id": Show.artist_id,
+    "artist_name": Artist.name.label("artist_name"),
+    "artist_image_link": Artist.image_link.label("artist_image_link"),
+    "venue_id": Show.venue_id,
+    "venue_name": Venue.name.label("venue_name"),
+    "venue_image_link": Venue.image_link.label("venue_image_link"),
+}
+
+
+def parse_fields(value, available):
+    """
+    Parse a comma-separated sparse fieldset, returning the names of the fields to
+    serialize, or every available field if none are given. Raises a ValueError for
+    fields which do not exist.
+    """
+    if not value:
+        return list(available)
+
+    fields = list(dict.fromkeys(name.strip() for name in value.split(",")))
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def project(fields, available, required=()):
+    """Columns to select for a sparse fieldset, along with any required fields"""
+    names = list(dict.fromkeys([*required, *fields]))
+    return [available[name] for name in names]
+
+
+def serialize(rows, fields, available):
+    """Convert rows selected with project() into dicts holding the given fields"""
+    attributes = [(name, available[name].key) for name in fields]
+    return [
+        {name: getattr(row, attribute, None) for name, attribute in attributes}
+        for row in rows
+    ]
+
+
+def encode(payload):
+    """
+    Encode a payload as compact JSON bytes, with orjson if the optional package is
+    installed, and the standard library otherwise. Datetimes are encoded in ISO 8601
+    format either way.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), default=json_value).encode()
+
+
+def compress(body, level):
+    return gzip.compress(body, compresslevel=level)
@@ -1,16 +1,37 @@
+import heapq
+import json
 import logging
+import string
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from datetime import datetime, timedelta
+from itertools import groupby, islice
 from logging import FileHandler, Formatter
+from types import SimpleNamespace
 
-import babel
 import dateutil.parser
-from flask import Flask, flash, redirect, render_template, request, url_for
+from flask import (
+    Flask,
+    Response,
+    abort,
+    flash,
+    has_request_context,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    stream_with_context,
+    url_for,
+)
 from flask_migrate import Migrate
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import func
+from markupsafe import Markup
+from sqlalchemy import and_, cast, event, false, func, true, tuple_
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
 
-from forms import ArtistForm, ShowForm, VenueForm
+from formatting import format_datetime
+from forms import ArtistForm, ShowSeriesForm, VenueForm
 
 
 # ====================
@@ -22,10 +43,105 @@ app = Flask(__name__)
 moment = Moment(app)
 app.config.from_object("config")
 
-from models import db, Artist, Show, Venue
+from cache import create_cache, create_fragment_cache
+from api import (
+    ARTIST_FIELDS,
+    SHOW_FIELDS,
+    VENUE_FIELDS,
+    compress,
+    encode,
+    parse_fields,
+    project,
+    serialize,
+)
+from exporter import EXPORTS, FORMATS, export
+from importer import IMPORTS, create_batch
+from http_cache import conditional
+from instrumentation import SQLInstrumentation
+from metrics import Metrics
+from replicas import ReadReplicas, read_only
+from models import (
+    db,
+    Artist,
+    Genre,
+    MAX_SHOW_DURATION,
+    Show,
+    ShowSeries,
+    ShowSeriesException,
+    Venue,
+    adjust_series_counts,
+    artist_version,
+    delete_artist_and_shows,
+    delete_venue_and_shows,
+    listing_version,
+    series_in_window,
+    shows_version,
+    update_if_current,
+    venue_version,
+)
+from commands import (
+    benchmark_batch_command,
+    benchmark_command,
+    benchmark_edits_command,
+    benchmark_formatting_command,
+    benchmark_metrics_command,
+    check_indexes_command,
+    export_command,
+    import_command,
+    partitions_command,
+    prevent_double_booking_command,
+    refresh_show_counts_command,
+    seed_command,
+)
 
 db.init_app(app)
 migrate = Migrate(app, db)
+replicas = ReadReplicas(app)
+cache = create_cache(app.config)
+fragment_cache = create_fragment_cache(app.config)
+instrumentation = SQLInstrumentation(app)
+metrics = Metrics(app, db, instrumentation)
+metrics.registry.counter(
+    "fyyur_fragment_cache_hits_total",
+    "Number of rendered fragments found in the fragment cache.",
+    lambda: fragment_cache.hits,
+)
+metrics.registry.counter(
+    "fyyur_fragment_cache_misses_total",
+    "Number of rendered fragments missing from the fragment cache.",
+    lambda: fragment_cache.misses,
+)
+
+
+@event.listens_for(Engine, "begin")
+def _set_statement_timeout(connection):
+    """
+    Cancel statements of requests, on the primary database and replicas alike, which
+    run for longer than SQL_STATEMENT_TIMEOUT. Migrations and commands are not limited,
+    as they may run for longer on a large database.
+    """
+    if has_request_context():
+        with connection.connection.cursor() as cursor:
+            cursor.execute(
+                "SET LOCAL statement_timeout = %s",
+                (app.config["SQL_STATEMENT_TIMEOUT"],),
+            )
+
+
+HOME_FEED_CACHE_KEY = "home_feed"
+
+app.cli.add_command(check_indexes_command)
+app.cli.add_command(refresh_show_counts_command)
+app.cli.add_command(benchmark_metrics_command)
+app.cli.add_command(benchmark_formatting_command)
+app.cli.add_command(seed_command)
+app.cli.add_command(benchmark_command)
+app.cli.add_command(benchmark_edits_command)
+app.cli.add_command(benchmark_batch_command)
+app.cli.add_command(import_command)
+app.cli.add_command(export_command)
+app.cli.add_command(prevent_double_booking_command)
+app.cli.add_command(partitions_command)
 
 
 # ====================
@@ -33,15 +149,6 @@ migrate = Migrate(app, db)
 # ====================
 
 
-def format_datetime(value, format="medium"):
-    date = dateutil.parser.parse(value)
-    if format == "full":
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == "medium":
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format, locale="en")
-
-
 app.jinja_env.filters["datetime"] = format_datetime
 
 
@@ -51,20 +158,19 @@ app.jinja_env.filters["datetime"] = format_datetime
 
 
 @app.route("/")
+@read_only
 def index():
     """
     Home page for Fyyur application, displaying recent listings
     """
     # Retrieve recently listed artists, venues and shows
-    recent_artists = _retrieve_recent_artists()
-    recent_venues = _retrieve_recent_venues()
-    recent_shows = _retrieve_recent_shows()
+    feed = _retrieve_home_feed()
 
     return render_template(
         "pages/home.html",
-        artists=recent_artists,
-        venues=recent_venues,
-        shows=recent_shows,
+        artists=feed["artists"],
+        venues=feed["venues"],
+        shows=feed["shows"],
     )
 
 
@@ -74,145 +180,148 @@ def index():
 
 
 @app.route("/venues")
+@read_only
+@conditional(lambda: listing_version(Venue))
 def venues():
     """
     Retrieve information for all listed venues, grouped by city and render the venues page.
+    Venues can be filtered to those with every genre given by the `genre` query
+    parameters, and the number of matching venues in each genre is shown.
     """
-    all_cities = Venue.query.with_entities(
-        func.count(Venue.id), Venue.city, Venue.state
-    ).group_by(Venue.city, Venue.state)
+    genres = request.args.getlist("genre")
+    condition = _genre_filter(Venue, genres)
+    all_venues = (
+        db.session.query(
+            Venue.id,
+            Venue.name,
+            Venue.city,
+            Venue.state,
+            Venue.upcoming_shows_count,
+        )
+        .filter(condition)
+        .order_by(Venue.state, Venue.city, Venue.name)
+        .all()
+    )
 
-    # Retrieve and group the venues in each selected city
+    # Group the venues by city in Python, relying on the ordering of the query
     data = []
-    for city in all_cities:
-        current_city = city[1]
-        current_state = city[2]
-        venues_in_city = (
-            Venue.query.filter_by(state=current_state)
-            .filter_by(city=current_city)
-            .all()
-        )
-
-        venues = []
-        for venue in venues_in_city:
-            num_upcoming_shows = len(
-                Show.query.filter_by(venue_id=venue.id)
-                .filter(Show.start_time > datetime.utcnow())
-                .all()
-            )
-
-            venues.append(
-                {
-                    "id": venue.id,
-                    "name": venue.name,
-                    "num_upcoming_shows": num_upcoming_shows,
-                }
-            )
-
-        data.append({"city": current_city, "state": current_state, "venues": venues})
+    for (city, state), venues_in_city in groupby(
+        all_venues, key=lambda venue: (venue.city, venue.state)
+    ):
+        venues = [
+            {
+                "id": venue.id,
+                "name": venue.name,
+                "num_upcoming_shows": venue.upcoming_shows_count,
+            }
+            for venue in venues_in_city
+        ]
+        data.append({"city": city, "state": state, "venues": venues})
 
-    return render_template("pages/venues.html", areas=data)
+    return render_template(
+        "pages/venues.html", areas=data, facets=_genre_facets(Venue, condition, genres)
+    )
 
 
-@app.route("/venues/<int:venue_id>")
-def show_venue(venue_id):
+@app.route("/venues/available")
+@read_only
+def available_venues():
     """
-    Retrieve all shows for a given venue, past and present, and their associated artist
-    information.
+    Find the venues with no show during the time window given by the `from` and `to`
+    query parameters, optionally in the city and state given by `city` and `state`.
+    Venues with a clashing show are excluded by an anti-join against the shows whose
+    time range overlaps the window, which are found with the GiST index on it. Shows
+    are bounded by start time as well, so only the partitions they may be in are read.
+    Venues with a clashing occurrence of a show series are excluded too, by expanding
+    the series which may have one.
     """
+    start = _parse_datetime_arg("from")
+    end = _parse_datetime_arg("to")
+    city = request.args.get("city", "").strip()
+    state = request.args.get("state", "").strip()
 
-    # Retrieve all past show information for the selected venue
-    past_shows_query = (
-        db.session.query(Show)
-        .join(Artist)
-        .filter(Show.venue_id == venue_id)
-        .filter(Show.start_time < datetime.now())
-        .all()
-    )
-    past_shows = []
-    for show in past_shows_query:
-        past_shows.append(
-            {
-                "artist_id": show.artist.id,
-                "artist_name": show.artist.name,
-                "artist_image_link": show.artist.image_link,
-                "start_time": show.start_time.strftime("%Y-%m-%d %H:%M:%S"),
-            }
+    venues = []
+    if start and end:
+        if end <= start:
+            abort(400)
+
+        earliest = start - timedelta(minutes=MAX_SHOW_DURATION)
+        clashing_shows = db.session.query(Show.id).filter(
+            Show.venue_id == Venue.id,
+            Show.during.overlaps(func.tsrange(start, end)),
+            Show.start_time < end,
+            Show.start_time > earliest,
         )
-
-    # Retrieve all upcoming show information for the selected venue
-    upcoming_shows_query = (
-        db.session.query(Show)
-        .join(Artist)
-        .filter(Show.venue_id == venue_id)
-        .filter(Show.start_time >= datetime.now())
-        .all()
-    )
-    upcoming_shows = []
-    for show in upcoming_shows_query:
-        upcoming_shows.append(
-            {
-                "artist_id": show.artist.id,
-                "artist_name": show.artist.name,
-                "artist_image_link": show.artist.image_link,
-                "start_time": show.start_time.strftime("%Y-%m-%d %H:%M:%S"),
-            }
+        query = db.session.query(Venue.id, Venue.name, Venue.city, Venue.state).filter(
+            ~clashing_shows.exists()
         )
+        series = true()
+        if city:
+            query = query.filter(Venue.city == city)
+            series = and_(series, Venue.city == city)
+        if state:
+            query = query.filter(Venue.state == state)
+            series = and_(series, Venue.state == state)
+
+        booked = {
+            occurrence.venue_id
+            for occurrence in _series_occurrences(series, earliest, end)
+            if occurrence.start_time + timedelta(minutes=occurrence.duration) > start
+        }
+        if booked:
+            query = query.filter(Venue.id.notin_(booked))
+        venues = query.order_by(Venue.state, Venue.city, Venue.name).all()
 
-    venue = Venue.query.filter_by(id=venue_id).one()
+    return render_template(
+        "pages/available_venues.html",
+        venues=venues,
+        city=city,
+        state=state,
+        start=start,
+        end=end,
+    )
 
-    data = {
-        "id": venue.id,
-        "name": venue.name,
-        "genres": venue.genres,
-        "address": venue.address,
-        "city": venue.city,
-        "state": venue.state,
-        "phone": venue.phone,
-        "website": venue.website_link,
-        "facebook_link": venue.facebook_link,
-        "seeking_talent": venue.seeking_talent,
-        "seeking_description": venue.seeking_description,
-        "image_link": venue.image_link,
-        "past_shows": past_shows,
-        "upcoming_shows": upcoming_shows,
-        "past_shows_count": len(past_shows),
-        "upcoming_shows_count": len(upcoming_shows),
-    }
 
-    return render_template("pages/show_venue.html", venue=data)
+@app.route("/venues/<int:venue_id>")
+@read_only
+@conditional(venue_version)
+def show_venue(venue_id):
+    """
+    Retrieve all shows for a given venue, past and present, and their associated artist
+    information. The rendered venue is cached until the venue, one of its shows or one
+    of their artists changes, or its next show starts.
+    """
+    key = f"venue:{venue_id}"
+    page = fragment_cache.get(key)
+    if page is None:
+        page = _render_venue(venue_id)
+        if page is None:
+            abort(404)
+
+    name, fragment = page
+    return render_template(
+        "pages/show_venue.html", name=name, fragment=Markup(fragment)
+    )
 
 
-@app.route("/venues/search", methods=["POST"])
+@app.route("/venues/search", methods=["GET", "POST"])
+@read_only
 def search_venues():
     """
     Search for venues with names that match a given search term provided by the
-    request body
+    request body or query string, ranked by how closely their names match
     """
-    search_term = request.form.get("search_term", "")
-    search_results = Venue.query.filter(Venue.name.ilike(f"%{search_term}%")).all()
-
-    venues = []
-    for venue in search_results:
-        num_upcoming_shows = len(
-            Show.query.filter_by(venue_id=venue.id)
-            .filter(Show.start_time < datetime.utcnow())
-            .all()
-        )
-        venues.append(
-            {
-                "id": venue.id,
-                "name": venue.name,
-                "num_upcoming_shows": num_upcoming_shows,
-            }
-        )
-
-    response = {"count": len(search_results), "data": venues}
+    search_term = request.values.get("search_term", "")
+    page = request.args.get("page", 1, type=int)
+    count, venues = _search(Venue, search_term, page)
 
+    response = {"count": count, "data": venues}
     return render_template(
         "pages/search_venues.html",
         results=response,
         search_term=search_term,
+        page=page,
+        has_next_page=page * app.config["SEARCH_RESULTS_PER_PAGE"] < count,
     )
 
 
@@ -242,6 +351,7 @@ def create_venue_submission():
 
         db.session.add(venue)
         db.session.commit()
+        _invalidate_home_feed()
         flash(f"Venue {request.form['name']} was successfully listed!", category="info")
     except:
         db.session.rollback()
@@ -282,36 +392,69 @@ def edit_venue(venue_id):
 @app.route("/venues/<int:venue_id>/edit", methods=["POST"])
 def edit_venue_submission(venue_id):
     """
-    Update venue details based on the provided information in the post request body
+    Update venue details based on the provided information in the post request body.
+    The venue is only updated if it is unchanged since the edit form was loaded,
+    otherwise the form is shown again with a 409 Conflict status.
     """
-    venue = Venue.query.get(venue_id)
+    version = request.form.get("version", type=int)
+    values = {
+        "name": request.form.get("name"),
+        "city": request.form.get("city"),
+        "state": request.form.get("state"),
+        "address": request.form.get("address"),
+        "phone": request.form.get("phone"),
+        "image_link": request.form.get("image_link"),
+        "genres": request.form.getlist("genres"),
+        "facebook_link": request.form.get("facebook_link"),
+        "website_link": request.form.get("website_link"),
+        "seeking_talent": True if request.form.get("seeking_talent") else False,
+        "seeking_description": request.form.get("seeking_description"),
+    }
+
+    conflict = False
     try:
-        venue.name = request.form.get("name")
-        venue.city = request.form.get("city")
-        venue.state = request.form.get("state")
-        venue.address = request.form.get("address")
-        venue.phone = request.form.get("phone")
-        venue.image_link = request.form.get("image_link")
-        venue.genres = request.form.get("genres")
-        if not isinstance(venue.genres, list):
-            venue.genres = [venue.genres]
-        venue.facebook_link = request.form.get("website_link")
-        venue.website_link = request.form.get("website_link")
-        venue.seeking_talent = True if request.form.get("seeking_talent") else False
-        venue.seeking_description = request.form.get("seeking_description")
-        db.session.commit()
-        flash(
-            f"Artist {request.form['name']} was successfully updated!", category="info"
-        )
+        result = update_if_current(Venue, venue_id, version, values)
+        if result is None:
+            raise LookupError(f"Venue {venue_id} does not exist")
+
+        conflict, updated = result
+        if conflict:
+            db.session.rollback()
+            flash(
+                f"Venue {request.form['name']} was changed by someone else while you "
+                "were editing it. Check your changes and save them again.",
+                category="error",
+            )
+        else:
+            db.session.commit()
+            if updated:
+                _invalidate_home_feed()
+                fragment_cache.invalidate(f"venue:{venue_id}")
+            flash(
+                f"Venue {request.form['name']} was successfully updated!",
+                category="info",
+            )
     except:
         db.session.rollback()
         flash(
-            f"An error occurred. Artist {request.form['name']} could not be updated.",
+            f"An error occurred. Venue {request.form['name']} could not be updated.",
             category="error",
         )
     finally:
         db.session.close()
 
+    if conflict:
+        # Show the submitted changes with the latest version of the venue, so that
+        # submitting them again overwrites it
+        return (
+            render_template(
+                "forms/edit_venue.html",
+                form=VenueForm(),
+                venue=Venue.query.get(venue_id),
+            ),
+            409,
+        )
+
     return redirect(url_for("show_venue", venue_id=venue_id))
 
 
@@ -322,19 +465,17 @@ def delete_venue(venue_id):
     venues page
     """
     try:
-        # To delete a venue, all shows associated with the venue also need to be deleted
-        shows = Show.query.filter_by(venue_id=venue_id).all()
-        show_count = 0
-        for show in shows:
-            show_count += 1
-            db.session.delete(show)
-
-        # Now all shows have deleted, proceed with deleting the venue
-        venue = Venue.query.filter_by(id=venue_id).first()
-        db.session.delete(venue)
+        # Shows associated with the venue are deleted by the database as it cascades
+        deleted = delete_venue_and_shows(venue_id)
+        if deleted is None:
+            raise LookupError(f"Venue {venue_id} does not exist")
+
         db.session.commit()
+        _invalidate_home_feed()
+        fragment_cache.invalidate(f"venue:{venue_id}")
+        name, show_count = deleted
         flash(
-            f"Venue '{venue.name}' has been deleted. {show_count} associated shows were also deleted.",
+            f"Venue '{name}' has been deleted. {show_count} associated shows were also deleted.",
             category="info",
         )
     except:
@@ -355,110 +496,116 @@ def delete_venue(venue_id):
 
 
 @app.route("/artists")
+@read_only
+@conditional(lambda: listing_version(Artist))
 def artists():
     """
-    Retrieve information for all listed artists and render them alphabetically on the
-    artists page.
+    Retrieve a page of listed artists, rendered alphabetically on the artists page with
+    an A-Z index jumping to the artists starting with each letter. Only the page of
+    artists is queried for each request, as the index and genre counts are cached.
+
+    Artists can be filtered by the optional `city` and `state` query parameters, and to
+    those with every genre given by the `genre` query parameters, with the number of
+    matching artists in each genre shown. Pages are keyset paginated on the name and id
+    of the artists, starting from the name given by `from`, with the cursor for the next
+    page given by `after`.
     """
-    data = Artist.query.order_by(Artist.name).all()
-    return render_template("pages/artists.html", artists=data)
+    genres = request.args.getlist("genre")
+    city = request.args.get("city", "").strip()
+    state = request.args.get("state", "").strip()
+    page_size = app.config["ARTISTS_PER_PAGE"]
+
+    condition = _genre_filter(Artist, genres)
+    if city:
+        condition = and_(condition, Artist.city == city)
+    if state:
+        condition = and_(condition, Artist.state == state)
+
+    # Artists without a name are listed last, in order of id
+    query = db.session.query(Artist.id, Artist.name).filter(condition)
+    named = query.filter(Artist.name.isnot(None))
+    unnamed = query.filter(Artist.name.is_(None))
+    if request.args.get("from"):
+        named = named.filter(Artist.name >= request.args["from"])
+    if "after" in request.args:
+        name, artist_id = _decode_cursor(
+            request.args["after"], lambda name: None if name is None else str(name), int
+        )
+        if name is None:
+            named = None
+            unnamed = unnamed.filter(Artist.id > artist_id)
+        else:
+            named = named.filter(tuple_(Artist.name, Artist.id) > (name, artist_id))
+
+    # Fetch one extra artist to find out whether there is a next page
+    rows = []
+    if named is not None:
+        rows = named.order_by(Artist.name, Artist.id).limit(page_size + 1).all()
+    if len(rows) <= page_size:
+        rows += unnamed.order_by(Artist.id).limit(page_size + 1 - len(rows)).all()
+
+    next_url = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_url = url_for(
+            "artists",
+            **{
+                **request.args.to_dict(flat=False),
+                "after": _encode_cursor(rows[-1].name, rows[-1].id),
+            },
+        )
+
+    filters = {"genre": genres, "city": city or None, "state": state or None}
+    return render_template(
+        "pages/artists.html",
+        artists=rows,
+        next_url=next_url,
+        city=city,
+        state=state,
+        **_artist_navigation(condition, genres, filters),
+    )
 
 
 @app.route("/artists/<int:artist_id>")
+@read_only
+@conditional(artist_version)
 def show_artist(artist_id):
     """
     Retrieve all shows for a given artist, past and present, and their associated venue
-    information.
+    information. The rendered artist is cached until the artist, one of their shows or
+    one of their venues changes, or their next show starts.
     """
-    past_shows_query = (
-        db.session.query(Show)
-        .join(Venue)
-        .filter(Show.artist_id == artist_id)
-        .filter(Show.start_time < datetime.now())
-        .all()
+    key = f"artist:{artist_id}"
+    page = fragment_cache.get(key)
+    if page is None:
+        page = _render_artist(artist_id)
+        if page is None:
+            abort(404)
+
+    name, fragment = page
+    return render_template(
+        "pages/show_artist.html", name=name, fragment=Markup(fragment)
     )
-    past_shows = []
-    for show in past_shows_query:
-        venue = Venue.query.filter_by(id=show.venue_id).one()
-        past_shows.append(
-            {
-                "venue_id": show.venue.id,
-                "venue_name": show.venue.name,
-                "venue_image_link": show.venue.image_link,
-                "start_time": show.start_time.strftime("%Y-%m-%d %H:%M:%S"),
-            }
-        )
 
-    upcoming_shows_query = (
-        db.session.query(Show)
-        .join(Venue)
-        .filter(Show.artist_id == artist_id)
-        .filter(Show.start_time >= datetime.now())
-        .all()
-    )
-    upcoming_shows = []
-    for show in upcoming_shows_query:
-        venue = Venue.query.filter_by(id=show.venue_id).one()
-        upcoming_shows.append(
-            {
-                "venue_id": show.venue.id,
-                "venue_name": show.venue.name,
-                "venue_image_link": show.venue.image_link,
-                "start_time": show.start_time.strftime("%Y-%m-%d %H:%M:%S"),
-            }
-        )
 
-    artist = Artist.query.filter_by(id=artist_id).one()
-    artist_data = {
-        "id": artist.id,
-        "name": artist.name,
-        "genres": artist.genres,
-        "city": artist.city,
-        "state": artist.state,
-        "phone": artist.phone,
-        "website": artist.website_link,
-        "facebook_link": artist.facebook_link,
-        "seeking_venue": artist.seeking_venue,
-        "seeking_description": artist.seeking_description,
-        "image_link": artist.image_link,
-        "past_shows": past_shows,
-        "upcoming_shows": upcoming_shows,
-        "past_shows_count": len(past_shows),
-        "upcoming_shows_count": len(upcoming_shows),
-    }
-
-    return render_template("pages/show_artist.html", artist=artist_data)
-
-
-@app.route("/artists/search", methods=["POST"])
+@app.route("/artists/search", methods=["GET", "POST"])
+@read_only
 def search_artists():
     """
     Search for artists with names that match a given search term provided by the
-    request body
+    request body or query string, ranked by how closely their names match
     """
-    search_term = request.form.get("search_term", "")
-    search_results = Artist.query.filter(Artist.name.ilike(f"%{search_term}%")).all()
-
-    artists = []
-    for artist in search_results:
-        num_upcoming_shows = len(
-            Show.query.filter_by(artist_id=artist.id)
-            .filter(Show.start_time < datetime.utcnow())
-            .all()
-        )
-        artists.append(
-            {
-                "id": artist.id,
-                "name": artist.name,
-                "num_upcoming_shows": num_upcoming_shows,
-            }
-        )
+    search_term = request.values.get("search_term", "")
+    page = request.args.get("page", 1, type=int)
+    count, artists = _search(Artist, search_term, page)
 
-    response = {"count": len(search_results), "data": artists}
+    response = {"count": count, "data": artists}
     return render_template(
-        "pages/search_venues.html",
+        "pages/search_artists.html",
         results=response,
         search_term=search_term,
+        page=page,
+        has_next_page=page * app.config["SEARCH_RESULTS_PER_PAGE"] < count,
     )
 
 
@@ -489,6 +636,8 @@ def create_artist_submission():
 
         db.session.add(artist)
         db.session.commit()
+        _invalidate_home_feed()
+        fragment_cache.invalidate("artists")
         flash(
             f"Artist {request.form['name']} was successfully listed!", category="info"
         )
@@ -531,27 +680,47 @@ def edit_artist(artist_id):
 @app.route("/artists/<int:artist_id>/edit", methods=["POST"])
 def edit_artist_submission(artist_id):
     """
-    Update artist details based on the provided information in the post request body
+    Update artist details based on the provided information in the post request body.
+    The artist is only updated if they are unchanged since the edit form was loaded,
+    otherwise the form is shown again with a 409 Conflict status.
     """
-    artist = Artist.query.get(artist_id)
+    version = request.form.get("version", type=int)
+    values = {
+        "name": request.form.get("name"),
+        "genres": request.form.getlist("genres"),
+        "city": request.form.get("city"),
+        "state": request.form.get("state"),
+        "phone": request.form.get("phone"),
+        "website_link": request.form.get("website_link"),
+        "facebook_link": request.form.get("facebook_link"),
+        "seeking_venue": True if request.form.get("seeking_venue") else False,
+        "seeking_description": request.form.get("seeking_description"),
+        "image_link": request.form.get("image_link"),
+    }
 
+    conflict = False
     try:
-        artist.name = request.form.get("name")
-        artist.genres = request.form.get("genres")
-        if not isinstance(artist.genres, list):
-            artist.genres = [artist.genres]
-        artist.city = request.form.get("city")
-        artist.state = request.form.get("state")
-        artist.phone = request.form.get("phone")
-        artist.website_link = request.form.get("website_link")
-        artist.facebook_link = request.form.get("website_link")
-        artist.seeking_venue = True if request.form.get("seeking_venue") else False
-        artist.seeking_description = request.form.get("seeking_description")
-        artist.image_link = request.form.get("image_link")
-        db.session.commit()
-        flash(
-            f"Artist {request.form['name']} was successfully updated!", category="info"
-        )
+        result = update_if_current(Artist, artist_id, version, values)
+        if result is None:
+            raise LookupError(f"Artist {artist_id} does not exist")
+
+        conflict, updated = result
+        if conflict:
+            db.session.rollback()
+            flash(
+                f"Artist {request.form['name']} was changed by someone else while you "
+                "were editing them. Check your changes and save them again.",
+                category="error",
+            )
+        else:
+            db.session.commit()
+            if updated:
+                _invalidate_home_feed()
+                fragment_cache.invalidate(f"artist:{artist_id}", "artists")
+            flash(
+                f"Artist {request.form['name']} was successfully updated!",
+                category="info",
+            )
     except:
         db.session.rollback()
         flash(
@@ -561,6 +730,18 @@ def edit_artist_submission(artist_id):
     finally:
         db.session.close()
 
+    if conflict:
+        # Show the submitted changes with the latest version of the artist, so that
+        # submitting them again overwrites it
+        return (
+            render_template(
+                "forms/edit_artist.html",
+                form=ArtistForm(),
+                artist=Artist.query.get(artist_id),
+            ),
+            409,
+        )
+
     return redirect(url_for("show_artist", artist_id=artist_id))
 
 
@@ -571,19 +752,17 @@ def delete_artist(artist_id):
     artist page
     """
     try:
-        # To delete an artist, all shows associated with the artist also need to be deleted
-        shows = Show.query.filter_by(artist_id=artist_id).all()
-        show_count = 0
-        for show in shows:
-            show_count += 1
-            db.session.delete(show)
-
-        # Now all shows have deleted, proceed with deleting the artist
-        artist = Artist.query.filter_by(id=artist_id).first()
-        db.session.delete(artist)
+        # Shows associated with the artist are deleted by the database as it cascades
+        deleted = delete_artist_and_shows(artist_id)
+        if deleted is None:
+            raise LookupError(f"Artist {artist_id} does not exist")
+
         db.session.commit()
+        _invalidate_home_feed()
+        fragment_cache.invalidate(f"artist:{artist_id}", "artists")
+        name, show_count = deleted
         flash(
-            f"Artist '{artist.name}' has been deleted. {show_count} associated shows were also deleted.",
+            f"Artist '{name}' has been deleted. {show_count} associated shows were also deleted.",
             category="info",
         )
     except:
@@ -604,28 +783,55 @@ def delete_artist(artist_id):
 
 
 @app.route("/shows")
+@read_only
+@conditional(shows_version)
 def shows():
     """
-    Retrieve information for all listed shows, rendered on the shows page in chronological order.
+    Retrieve a page of listed shows and occurrences of show series, rendered on the
+    shows page in chronological order.
+
+    Shows can be limited to a window of start times with the optional `from` and `to`
+    query parameters, where `to` is exclusive. Pages are keyset paginated on the start
+    time and id of the shows, with the cursor for the next page given by `after`.
+    Occurrences of show series are expanded lazily, only as far as the page reaches.
     """
-    shows = Show.query.order_by(Show.start_time).all()
+    start = _parse_datetime_arg("from")
+    end = _parse_datetime_arg("to")
+    page_size = app.config["SHOWS_PER_PAGE"]
+
+    query = (
+        db.session.query(
+            Show.id.label("show_id"),
+            Show.start_time,
+            Venue.id.label("venue_id"),
+            Venue.name.label("venue_name"),
+            Artist.id.label("artist_id"),
+            Artist.name.label("artist_name"),
+            Artist.image_link.label("artist_image_link"),
+        )
+        .join(Venue, Venue.id == Show.venue_id)
+        .join(Artist, Artist.id == Show.artist_id)
+    )
+    rows, after = _shows_page(query, true(), start, end, page_size)
+
+    next_url = None
+    if after:
+        next_url = url_for("shows", **{**request.args.to_dict(), "after": after})
 
     data = []
-    for show in shows:
-        venue = Venue.query.filter_by(id=show.venue_id).one()
-        artist = Artist.query.filter_by(id=show.artist_id).one()
+    for show in rows:
         data.append(
             {
-                "venue_id": venue.id,
-                "venue_name": venue.name,
-                "artist_id": artist.id,
-                "artist_name": artist.name,
-                "artist_image_link": artist.image_link,
-                "start_time": show.start_time.strftime("%Y-%m-%d %H:%M:%S"),
+                "venue_id": show.venue_id,
+                "venue_name": show.venue_name,
+                "artist_id": show.artist_id,
+                "artist_name": show.artist_name,
+                "artist_image_link": show.artist_image_link,
+                "start_time": show.start_time,
             }
         )
 
-    return render_template("pages/shows.html", shows=data)
+    return render_template("pages/shows.html", shows=data, next_url=next_url)
 
 
 @app.route("/shows/create")
@@ -633,7 +839,7 @@ def create_shows():
     """
     Render the create new show form.
     """
-    form = ShowForm()
+    form = ShowSeriesForm()
 
     return render_template("forms/new_show.html", form=form)
 
@@ -641,12 +847,23 @@ def create_shows():
 @app.route("/shows/create", methods=["POST"])
 def create_show_submission():
     """
-    Create a new show based on information provided by the post request body.
+    Create a new show based on information provided by the post request body. Shows
+    with a recurrence are listed once as a show series, rather than once per occurrence.
     """
     try:
-        show = Show(**request.form)
+        data = request.form.to_dict()
+        recurrence = data.pop("recurrence", "").strip()
+        if recurrence:
+            show = ShowSeries(**data, recurrence=recurrence)
+            show.update_period()
+        else:
+            show = Show(**data)
         db.session.add(show)
         db.session.commit()
+        _invalidate_home_feed()
+        fragment_cache.delete(
+            f"artist:{request.form['artist_id']}", f"venue:{request.form['venue_id']}"
+        )
         flash(f"Show was successfully listed!", category="info")
     except:
         db.session.rollback()
@@ -657,39 +874,1004 @@ def create_show_submission():
     return redirect(url_for("index"))
 
 
+@app.route("/series/<int:series_id>/<occurrence>", methods=["POST", "DELETE"])
+def edit_series_occurrence(series_id, occurrence):
+    """
+    Cancel or reschedule a single occurrence of a show series, given by the start time
+    the recurrence gives it, and then render the venue page. The occurrence is moved if
+    a new `start_time` or `duration` is posted, and cancelled otherwise. Only the
+    change is stored, as an exception to the series.
+    """
+    venue_id = None
+    try:
+        series = ShowSeries.query.get(series_id)
+        occurrence = _local_datetime(datetime.fromisoformat(occurrence))
+        if series is None or occurrence not in series.rule:
+            raise LookupError(f"Show series {series_id} has no such occurrence")
+        venue_id = series.venue_id
+
+        # The occurrences are counted again once the exception has changed
+        adjust_series_counts(series, -1)
+        exception = ShowSeriesException.query.get((series_id, occurrence))
+        if exception is None:
+            exception = ShowSeriesException(series=series, occurrence=occurrence)
+
+        start_time = request.form.get("start_time", "").strip()
+        duration = request.form.get("duration", "").strip()
+        cancelled = not (start_time or duration)
+        exception.cancelled = cancelled
+        exception.start_time = (
+            _local_datetime(dateutil.parser.parse(start_time)) if start_time else None
+        )
+        exception.duration = int(duration) if duration else None
+
+        # The series is updated along with its exceptions, so its pages are modified
+        series.update_period()
+        series.updated_at = func.now()
+        adjust_series_counts(series, 1)
+        db.session.commit()
+        fragment_cache.invalidate(f"series:{series_id}")
+        if cancelled:
+            flash(f"Show was successfully cancelled!", category="info")
+        else:
+            flash(f"Show was successfully rescheduled!", category="info")
+    except:
+        db.session.rollback()
+        flash(f"An error occurred. Show could not be changed.", category="error")
+    finally:
+        db.session.close()
+
+    if venue_id is None:
+        return redirect(url_for("shows"))
+    return redirect(url_for("show_venue", venue_id=venue_id))
+
+
+# ====================
+#  Search
+# ====================
+
+
+@app.route("/search/suggest")
+@read_only
+def search_suggest():
+    """
+    Suggest artists and venues with names starting with the query provided by the `q`
+    query parameter, for typeahead as the user types a search term
+    """
+    prefix = request.args.get("q", "").strip().lower()
+    prefix = prefix[: app.config["SEARCH_SUGGEST_MAX_LENGTH"]]
+    if not prefix:
+        return jsonify(artists=[], venues=[])
+
+    cache_key = f"suggest:{prefix}"
+    suggestions = cache.get(cache_key)
+    if suggestions is None:
+        # Suggestions are cached for other clients too, so they are read from the
+        # primary database, which a replica may not have caught up with yet
+        with replicas.primary():
+            suggestions = _suggest_from_shorter_prefix(prefix) or {
+                "artists": _suggest(Artist, prefix),
+                "venues": _suggest(Venue, prefix),
+            }
+        cache.set(cache_key, suggestions, timeout=app.config["SEARCH_SUGGEST_TIMEOUT"])
+
+    return jsonify(suggestions)
+
+
+# ====================
+#  Export
+# ====================
+
+
+@app.route("/export/<kind>.<file_format>")
+@read_only
+def export_file(kind, file_format):
+    """
+    Download every show, artist or venue as NDJSON or CSV. The response is streamed as
+    rows are read from the database, rather than built in memory.
+    """
+    if kind not in EXPORTS or file_format not in FORMATS:
+        abort(404)
+
+    return Response(
+        stream_with_context(export(kind, file_format)),
+        mimetype=FORMATS[file_format],
+        headers={"Content-Disposition": f"attachment; filename={kind}.{file_format}"},
+    )
+
+
+# ====================
+#  Batch API
+# ====================
+
+
+@app.route("/api/<kind>:batch", methods=["POST"])
+def create_batch_submission(kind):
+    """
+    Create a batch of shows, artists or venues from a JSON array in the request body,
+    validating each with the rules of the form used to create one, and inserting them
+    all in one transaction. Responds with a result for each item in order, holding the
+    id of the record created or the errors which rejected it.
+    """
+    if kind not in IMPORTS:
+        abort(404)
+
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        return jsonify(error="The request body must be a JSON array."), 400
+
+    max_size = app.config["API_BATCH_MAX_SIZE"]
+    if len(items) > max_size:
+        return jsonify(error=f"Batches may hold at most {max_size} items."), 413
+
+    try:
+        results, created = create_batch(kind, items)
+    except IntegrityError:
+        # Such as a show double booking its venue, when double bookings are prevented
+        db.session.rollback()
+        return jsonify(error=f"The {kind} conflict with existing records."), 409
+    except:
+        db.session.rollback()
+        app.logger.exception(f"Batch of {kind} could not be created")
+        return jsonify(error=f"An error occurred. No {kind} were created."), 500
+    finally:
+        db.session.close()
+
+    if created:
+        _invalidate_home_feed()
+        if kind == "artists":
+            fragment_cache.invalidate("artists")
+        elif kind == "shows":
+            fragment_cache.delete(
+                *{f"artist:{show['artist_id']}" for show in created},
+                *{f"venue:{show['venue_id']}" for show in created},
+            )
+
+    return jsonify(
+        created=len(created), rejected=len(results) - len(created), results=results
+    )
+
+
+# ====================
+#  API v1
+# ====================
+
+
+@app.route("/api/v1/venues")
+@read_only
+def api_venues():
+    """
+    List venues in order of id, optionally in the city and state given by `city` and
+    `state`. Pages hold `limit` venues, with the cursor for the next page given by
+    `after`, and `fields` selects a comma-separated subset of the fields of each venue.
+    """
+    return _api_list(Venue, VENUE_FIELDS)
+
+
+@app.route("/api/v1/venues/<int:venue_id>")
+@read_only
+def api_venue(venue_id):
+    """
+    Retrieve a venue, with `fields` selecting a comma-separated subset of its fields.
+    """
+    return _api_detail(Venue, VENUE_FIELDS, venue_id)
+
+
+@app.route("/api/v1/venues/<int:venue_id>/shows")
+@read_only
+def api_venue_shows(venue_id):
+    """
+    List the shows of a venue, paginated and filtered like the list of all shows.
+    """
+    return _api_shows(
+        Venue, venue_id, Show.venue_id == venue_id, ShowSeries.venue_id == venue_id
+    )
+
+
+@app.route("/api/v1/artists")
+@read_only
+def api_artists():
+    """
+    List artists in order of id, optionally in the city and state given by `city` and
+    `state`. Pages hold `limit` artists, with the cursor for the next page given by
+    `after`, and `fields` selects a comma-separated subset of the fields of each artist.
+    """
+    return _api_list(Artist, ARTIST_FIELDS)
+
+
+@app.route("/api/v1/artists/<int:artist_id>")
+@read_only
+def api_artist(artist_id):
+    """
+    Retrieve an artist, with `fields` selecting a comma-separated subset of their fields.
+    """
+    return _api_detail(Artist, ARTIST_FIELDS, artist_id)
+
+
+@app.route("/api/v1/artists/<int:artist_id>/shows")
+@read_only
+def api_artist_shows(artist_id):
+    """
+    List the shows of an artist, paginated and filtered like the list of all shows.
+    """
+    return _api_shows(
+        Artist,
+        artist_id,
+        Show.artist_id == artist_id,
+        ShowSeries.artist_id == artist_id,
+    )
+
+
+@app.route("/api/v1/shows")
+@read_only
+def api_shows():
+    """
+    List shows and the occurrences of show series in chronological order, optionally
+    within the window of start times given by `from` and `to`. Pages hold `limit`
+    shows, with the cursor for the next page given by `after`, and `fields` selects a
+    comma-separated subset of the fields of each show.
+    """
+    return _api_shows(None, None, true(), true())
+
+
+@app.route("/api/v1/shows/<int:show_id>")
+@read_only
+def api_show(show_id):
+    """
+    Retrieve a show, with `fields` selecting a comma-separated subset of its fields.
+    """
+    return _api_detail(Show, SHOW_FIELDS, show_id)
+
+
 # ===================
 #  Utility functions
 # ===================
 
 
+def _api_response(payload):
+    """
+    Encode a payload as a JSON response, compressed with gzip if it is large enough to
+    be worth it and the client accepts it
+    """
+    body = encode(payload)
+    response = app.response_class(body, mimetype="application/json")
+    response.vary.add("Accept-Encoding")
+    if (
+        len(body) >= app.config["API_GZIP_MIN_SIZE"]
+        and request.accept_encodings.quality("gzip") > 0
+    ):
+        response.set_data(compress(body, app.config["API_GZIP_LEVEL"]))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+def _api_fields(available):
+    """Parse the sparse fieldset given by the `fields` query parameter"""
+    try:
+        return parse_fields(request.args.get("fields"), available)
+    except ValueError as error:
+        abort(400, description=str(error))
+
+
+def _api_limit():
+    """Parse the page size given by the `limit` query parameter"""
+    limit = request.args.get("limit", app.config["API_PAGE_SIZE"], type=int)
+    if not 1 <= limit <= app.config["API_MAX_PAGE_SIZE"]:
+        abort(
+            400,
+            description=f"Limit must be between 1 and {app.config['API_MAX_PAGE_SIZE']}.",
+        )
+    return limit
+
+
+def _api_next_url(after):
+    return url_for(
+        request.endpoint,
+        **request.view_args,
+        **{**request.args.to_dict(), "after": after},
+    )
+
+
+def _api_show_query(fields):
+    """Query the columns of a sparse fieldset of shows, joining only what they need"""
+    query = db.session.query(
+        *project(fields, SHOW_FIELDS, required=("id", "start_time"))
+    ).select_from(Show)
+    if {"artist_name", "artist_image_link"} & set(fields):
+        query = query.join(Artist, Artist.id == Show.artist_id)
+    if {"venue_name", "venue_image_link"} & set(fields):
+        query = query.join(Venue, Venue.id == Show.venue_id)
+    return query
+
+
+def _api_list(model, available):
+    """Respond with a page of venues or artists, keyset paginated on their id"""
+    fields = _api_fields(available)
+    limit = _api_limit()
+
+    query = db.session.query(*project(fields, available, required=("id",)))
+    for name in ("city", "state"):
+        if request.args.get(name):
+            query = query.filter(getattr(model, name) == request.args[name])
+    if "after" in request.args:
+        (after,) = _decode_cursor(request.args["after"], int)
+        query = query.filter(model.id > after)
+
+    # Fetch one extra row to find out whether there is a next page
+    rows = query.order_by(model.id).limit(limit + 1).all()
+
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_url = _api_next_url(_encode_cursor(rows[-1].id))
+
+    return _api_response({"data": serialize(rows, fields, available), "next": next_url})
+
+
+def _api_detail(model, available, entity_id):
+    """Respond with a single venue, artist or show"""
+    fields = _api_fields(available)
+    if model is Show:
+        query = _api_show_query(fields)
+    else:
+        query = db.session.query(*project(fields, available))
+
+    row = query.filter(model.id == entity_id).first()
+    if row is None:
+        abort(404)
+
+    return _api_response({"data": serialize([row], fields, available)[0]})
+
+
+def _api_shows(model, entity_id, condition, series_condition):
+    """
+    Respond with a page of the shows matching a condition, merged in chronological
+    order with the occurrences of the show series matching another, for all shows or
+    those of a venue or artist
+    """
+    fields = _api_fields(SHOW_FIELDS)
+    limit = _api_limit()
+    start = _parse_datetime_arg("from")
+    end = _parse_datetime_arg("to")
+
+    query = _api_show_query(fields).filter(condition)
+    rows, after = _shows_page(query, series_condition, start, end, limit)
+
+    # An empty first page may be for a venue or artist which does not exist
+    if model is not None and not rows and "after" not in request.args:
+        if db.session.query(model.id).filter(model.id == entity_id).first() is None:
+            abort(404)
+
+    return _api_response(
+        {
+            "data": serialize(rows, fields, SHOW_FIELDS),
+            "next": _api_next_url(after) if after else None,
+        }
+    )
+
+
+def _genre_filter(model, genres):
+    """
+    Condition matching the venues or artists with every one of the given genres, by
+    their genre ids so the GIN index on them can be used
+    """
+    if not genres:
+        return true()
+
+    genre_ids = [
+        id for id, in db.session.query(Genre.id).filter(Genre.name.in_(genres))
+    ]
+    if len(genre_ids) < len(set(genres)):
+        # One of the genres does not exist, so no venue or artist can have it
+        return false()
+
+    return model.genre_ids.contains(cast(genre_ids, model.genre_ids.type))
+
+
+def _genre_facets(model, condition, genres):
+    """
+    Count the venues or artists matching a condition in each genre in one grouped query,
+    along with links adding the genre to or removing it from the selected genres
+    """
+    matching = (
+        db.session.query(func.unnest(model.genre_ids).label("genre_id"))
+        .filter(condition)
+        .subquery()
+    )
+    counts = (
+        db.session.query(Genre.name, func.count())
+        .join(matching, matching.c.genre_id == Genre.id)
+        .group_by(Genre.name)
+        .order_by(Genre.name)
+    )
+
+    facets = []
+    for name, count in counts:
+        selected = name in genres
+        if selected:
+            link_genres = [genre for genre in genres if genre != name]
+        else:
+            link_genres = genres + [name]
+        facets.append(
+            {
+                "name": name,
+                "count": count,
+                "selected": selected,
+                "url": url_for(
+                    request.endpoint,
+                    **{
+                        **request.args.to_dict(flat=False),
+                        "genre": link_genres,
+                        "after": None,
+                        "from": None,
+                    },
+                ),
+            }
+        )
+
+    return facets
+
+
+def _artist_navigation(condition, genres, filters):
+    """
+    Retrieve the genre facets and A-Z index of the artists matching a condition from the
+    cache, or count the artists in each genre and sorted from each letter up to the next.
+    Each letter links to the artists from it, and has the position of its first artist
+    in the list.
+    """
+    key = "artist_navigation:" + _encode_cursor(filters)
+    navigation = fragment_cache.get(key)
+    if navigation is None:
+        started = fragment_cache.start(replicas.lag())
+        # Artists are counted with the same comparisons as they are listed with, in the
+        # database's collation, so each letter's position matches the listing
+        counts = (
+            db.session.query(
+                *(
+                    func.count().filter(Artist.name < letter)
+                    for letter in string.ascii_uppercase
+                ),
+                func.count(Artist.name),
+            )
+            .filter(condition)
+            .one()
+        )
+
+        letters = [
+            {
+                "letter": letter,
+                "count": counts[i + 1] - counts[i],
+                "offset": counts[i],
+                "url": url_for("artists", **filters, **{"from": letter}),
+            }
+            for i, letter in enumerate(string.ascii_uppercase)
+        ]
+
+        navigation = {
+            "facets": _genre_facets(Artist, condition, genres),
+            "letters": letters,
+        }
+        fragment_cache.set(
+            key,
+            navigation,
+            started,
+            tags=["artists"],
+            timeout=app.config["ARTIST_NAVIGATION_TIMEOUT"],
+        )
+
+    return navigation
+
+
+def _escape_like(term):
+    """Escape the wildcard characters in a term used in a LIKE pattern"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _search(model, search_term, page):
+    """
+    Retrieve a page of venues or artists with names containing the search term, ranked
+    by trigram similarity, along with the total number of matches
+    """
+    page_size = app.config["SEARCH_RESULTS_PER_PAGE"]
+    rows = (
+        db.session.query(
+            model.id,
+            model.name,
+            model.upcoming_shows_count,
+            func.count().over().label("total"),
+        )
+        .filter(model.name.ilike(f"%{_escape_like(search_term)}%"))
+        .order_by(func.similarity(model.name, search_term).desc(), model.name, model.id)
+        .limit(page_size)
+        .offset((max(page, 1) - 1) * page_size)
+        .all()
+    )
+
+    results = [
+        {
+            "id": row.id,
+            "name": row.name,
+            "num_upcoming_shows": row.upcoming_shows_count,
+        }
+        for row in rows
+    ]
+    return (rows[0].total if rows else 0), results
+
+
+def _suggest(model, prefix):
+    """Retrieve the shortest venue or artist names starting with the prefix"""
+    rows = (
+        db.session.query(model.id, model.name)
+        .filter(model.name.ilike(f"{_escape_like(prefix)}%"))
+        .order_by(func.length(model.name), model.name)
+        .limit(app.config["SEARCH_SUGGEST_SIZE"])
+        .all()
+    )
+    return [{"id": row.id, "name": row.name} for row in rows]
+
+
+def _suggest_from_shorter_prefix(prefix):
+    """
+    Narrow down the cached suggestions for the prefix without its last character, if
+    they were not truncated and therefore contain every match for the prefix
+    """
+    suggestions = cache.get(f"suggest:{prefix[:-1]}") if len(prefix) > 1 else None
+    if suggestions is None or any(
+        len(matches) >= app.config["SEARCH_SUGGEST_SIZE"]
+        for matches in suggestions.values()
+    ):
+        return None
+
+    return {
+        category: [
+            match for match in matches if match["name"].lower().startswith(prefix)
+        ]
+        for category, matches in suggestions.items()
+    }
+
+
+def _parse_datetime_arg(name):
+    """
+    Parse an optional date or datetime query parameter, aborting with a 400 error if it
+    is invalid
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+
+    try:
+        return _local_datetime(dateutil.parser.parse(value))
+    except (OverflowError, ValueError):
+        abort(400)
+
+
+def _local_datetime(value):
+    """
+    Convert a datetime with a time zone to the naive local time shows are stored and
+    compared in, leaving naive datetimes as they are
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def _encode_cursor(*values):
+    """Encode the sort key of the last row on a page as an opaque pagination cursor"""
+    return urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def _decode_cursor(cursor, *types):
+    """
+    Decode a pagination cursor created by _encode_cursor, converting each value of the
+    sort key to the given types. Invalid cursors abort the request with a 400 error.
+    """
+    try:
+        values = json.loads(urlsafe_b64decode(cursor.encode()))
+        if len(values) != len(types):
+            raise ValueError("Cursor does not match the sort key")
+        return [convert(value) for convert, value in zip(types, values)]
+    except (TypeError, ValueError):
+        abort(400)
+
+
+def _show_sort_key(show):
+    """
+    Sort key of a show row or series occurrence, ordering occurrences after the shows
+    starting at the same time, which is also used as the cursor of the shows page
+    """
+    if show.show_id is None:
+        return show.start_time, 1, show.series_id
+    return show.start_time, 0, show.show_id
+
+
+def _occurrence_rows(row, start, end, days_ahead=None):
+    """
+    Lazily generate the occurrences of a show series found by series_in_window which
+    start within a window, as rows shaped like those of the show queries. The window
+    may be limited to a number of days after now, or the start of the series if later.
+    """
+    series = row.ShowSeries
+    if days_ahead is not None:
+        horizon = series.horizon(days_ahead)
+        end = horizon if end is None else min(end, horizon)
+    for start_time, duration, occurrence in series.occurrences(start, end):
+        yield SimpleNamespace(
+            show_id=None,
+            series_id=series.id,
+            occurrence=occurrence,
+            start_time=start_time,
+            duration=duration,
+            venue_id=series.venue_id,
+            venue_name=row.venue_name,
+            venue_image_link=row.venue_image_link,
+            artist_id=series.artist_id,
+            artist_name=row.artist_name,
+            artist_image_link=row.artist_image_link,
+        )
+
+
+def _series_occurrences(condition, start=None, end=None, days_ahead=None):
+    """
+    Lazily expand the occurrences of the show series matching a condition which start
+    within a window of start times, where end is exclusive, in order. Each series is
+    only expanded as far as the occurrences are consumed.
+    """
+    return heapq.merge(
+        *(
+            _occurrence_rows(row, start, end, days_ahead)
+            for row in series_in_window(condition, start, end)
+        ),
+        key=_show_sort_key,
+    )
+
+
+def _shows_page(query, series_condition, start, end, page_size):
+    """
+    Retrieve a page of the shows selected by a query, merged in chronological order with
+    the occurrences of the show series matching a condition, which start within a window
+    and after the cursor given by the `after` query parameter. Returns the rows on the
+    page and the cursor for the next page, or None if it is the last page.
+    """
+    if start:
+        query = query.filter(Show.start_time >= start)
+    if end:
+        query = query.filter(Show.start_time < end)
+
+    # Occurrences are ordered after the shows starting at the same time, so the cursor
+    # holds whether the last row on the page was a show or an occurrence
+    after = None
+    if "after" in request.args:
+        after = _decode_cursor(
+            request.args["after"],
+            lambda value: _local_datetime(datetime.fromisoformat(value)),
+            int,
+            int,
+        )
+        after_time, after_series, after_id = after
+        if after_series:
+            query = query.filter(Show.start_time > after_time)
+        else:
+            query = query.filter(
+                tuple_(Show.start_time, Show.id) > tuple_(after_time, after_id)
+            )
+        start = max(start, after_time) if start else after_time
+
+    # Fetch one extra show to find out whether there is a next page
+    rows = query.order_by(Show.start_time, Show.id).limit(page_size + 1).all()
+
+    # A page cannot reach past the last show fetched, so series are only expanded up to
+    # its start time when a whole page of shows was found
+    if len(rows) > page_size:
+        end = rows[-1].start_time
+    occurrences = _series_occurrences(series_condition, start, end)
+    if after:
+        occurrences = (o for o in occurrences if _show_sort_key(o) > tuple(after))
+
+    rows = list(
+        islice(heapq.merge(rows, occurrences, key=_show_sort_key), page_size + 1)
+    )
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, _encode_cursor(*_show_sort_key(rows[-1]))
+    return rows, None
+
+
+def _with_series_occurrences(rows, series):
+    """
+    Merge the show rows of a venue or artist page query with the occurrences of their
+    show series, found by series_in_window, in order of start time. Series are listed up
+    to SHOW_SERIES_DAYS_AHEAD days ahead, or after their first occurrence if it is
+    further ahead.
+    """
+    # A venue or artist with no shows is returned as a single row without a show
+    shows = (row for row in rows if row.start_time is not None)
+    days_ahead = app.config["SHOW_SERIES_DAYS_AHEAD"]
+    occurrences = heapq.merge(
+        *(_occurrence_rows(row, None, None, days_ahead) for row in series),
+        key=_show_sort_key,
+    )
+    return list(heapq.merge(shows, occurrences, key=_show_sort_key))
+
+
+def _split_shows(shows, columns):
+    """
+    Split the shows and series occurrences of a venue or artist page into past and
+    upcoming shows, keeping the given columns for each show
+    """
+    now = datetime.now()
+    past_shows = []
+    upcoming_shows = []
+    for row in shows:
+        show = {column: getattr(row, column) for column in columns}
+        show["start_time"] = row.start_time
+        # Occurrences of a show series can be cancelled from the page
+        show["series_id"] = getattr(row, "series_id", None)
+        show["occurrence"] = getattr(row, "occurrence", None)
+        if row.start_time < now:
+            past_shows.append(show)
+        else:
+            upcoming_shows.append(show)
+
+    return past_shows, upcoming_shows
+
+
+def _render_venue(venue_id):
+    """
+    Render the details and shows of a venue, storing them in the fragment cache. Returns
+    the name of the venue and the rendered fragment, or None if the venue does not exist.
+    """
+    started = fragment_cache.start(replicas.lag())
+
+    # Retrieve the venue along with each of its shows and their artists in one query,
+    # selecting only the columns needed for the venue page
+    rows = (
+        db.session.query(
+            Venue.id,
+            Venue.name,
+            Venue.genres,
+            Venue.address,
+            Venue.city,
+            Venue.state,
+            Venue.phone,
+            Venue.website_link,
+            Venue.facebook_link,
+            Venue.seeking_talent,
+            Venue.seeking_description,
+            Venue.image_link,
+            Show.id.label("show_id"),
+            Show.start_time,
+            Artist.id.label("artist_id"),
+            Artist.name.label("artist_name"),
+            Artist.image_link.label("artist_image_link"),
+        )
+        .outerjoin(Show, Show.venue_id == Venue.id)
+        .outerjoin(Artist, Artist.id == Show.artist_id)
+        .filter(Venue.id == venue_id)
+        .order_by(Show.start_time)
+        .all()
+    )
+    if not rows:
+        return None
+
+    venue = rows[0]
+    series = series_in_window(ShowSeries.venue_id == venue_id)
+    shows = _with_series_occurrences(rows, series)
+    past_shows, upcoming_shows = _split_shows(
+        shows, ("artist_id", "artist_name", "artist_image_link")
+    )
+
+    data = {
+        "id": venue.id,
+        "name": venue.name,
+        "genres": venue.genres,
+        "address": venue.address,
+        "city": venue.city,
+        "state": venue.state,
+        "phone": venue.phone,
+        "website": venue.website_link,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link,
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows_count": len(upcoming_shows),
+    }
+
+    page = (venue.name, render_template("fragments/venue.html", venue=data))
+    fragment_cache.set(
+        f"venue:{venue_id}",
+        page,
+        started,
+        tags=_fragment_tags(shows, series, f"venue:{venue_id}", "artist"),
+        timeout=_fragment_timeout(shows),
+    )
+    return page
+
+
+def _render_artist(artist_id):
+    """
+    Render the details and shows of an artist, storing them in the fragment cache.
+    Returns the name of the artist and the rendered fragment, or None if the artist does
+    not exist.
+    """
+    started = fragment_cache.start(replicas.lag())
+
+    # Retrieve the artist along with each of their shows and its venue in one query,
+    # selecting only the columns needed for the artist page
+    rows = (
+        db.session.query(
+            Artist.id,
+            Artist.name,
+            Artist.genres,
+            Artist.city,
+            Artist.state,
+            Artist.phone,
+            Artist.website_link,
+            Artist.facebook_link,
+            Artist.seeking_venue,
+            Artist.seeking_description,
+            Artist.image_link,
+            Show.id.label("show_id"),
+            Show.start_time,
+            Venue.id.label("venue_id"),
+            Venue.name.label("venue_name"),
+            Venue.image_link.label("venue_image_link"),
+        )
+        .outerjoin(Show, Show.artist_id == Artist.id)
+        .outerjoin(Venue, Venue.id == Show.venue_id)
+        .filter(Artist.id == artist_id)
+        .order_by(Show.start_time)
+        .all()
+    )
+    if not rows:
+        return None
+
+    artist = rows[0]
+    series = series_in_window(ShowSeries.artist_id == artist_id)
+    shows = _with_series_occurrences(rows, series)
+    past_shows, upcoming_shows = _split_shows(
+        shows, ("venue_id", "venue_name", "venue_image_link")
+    )
+
+    artist_data = {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": artist.genres,
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "website": artist.website_link,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.seeking_venue,
+        "seeking_description": artist.seeking_description,
+        "image_link": artist.image_link,
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows_count": len(upcoming_shows),
+    }
+
+    page = (artist.name, render_template("fragments/artist.html", artist=artist_data))
+    fragment_cache.set(
+        f"artist:{artist_id}",
+        page,
+        started,
+        tags=_fragment_tags(shows, series, f"artist:{artist_id}", "venue"),
+        timeout=_fragment_timeout(shows),
+    )
+    return page
+
+
+def _fragment_tags(shows, series, tag, other):
+    """
+    Tag the rendered venue or artist of a page with itself, each of its shows and show
+    series, whether or not the series has an occurrence on the page, and the artist or
+    venue of each show and series
+    """
+    tags = [tag]
+    for show in shows:
+        if show.show_id is not None:
+            tags.append(f"show:{show.show_id}")
+        tags.append(f"{other}:{getattr(show, other + '_id')}")
+    for row in series:
+        tags.append(f"series:{row.ShowSeries.id}")
+        tags.append(f"{other}:{getattr(row.ShowSeries, other + '_id')}")
+    return tags
+
+
+def _fragment_timeout(shows):
+    """
+    Number of seconds the rendered venue or artist of a page may be cached for, until
+    its next show starts and moves from upcoming to past
+    """
+    timeout = app.config["FRAGMENT_CACHE_TIMEOUT"]
+    now = datetime.now()
+    for show in shows:
+        if show.start_time >= now:
+            return min(timeout, int((show.start_time - now).total_seconds()) + 1)
+    return timeout
+
+
+def _retrieve_home_feed():
+    """
+    Retrieve the recently listed artists, venues and shows for the home page from the
+    cache, or from the primary database if they have expired or been invalidated
+    """
+    feed = cache.get(HOME_FEED_CACHE_KEY)
+    if feed is None:
+        # The feed is cached until it is invalidated, so it is read from the primary
+        # database, which a replica may not have caught up with yet
+        with replicas.primary():
+            feed = {
+                "artists": _retrieve_recent_artists(),
+                "venues": _retrieve_recent_venues(),
+                "shows": _retrieve_recent_shows(),
+            }
+        cache.set(HOME_FEED_CACHE_KEY, feed, timeout=app.config["HOME_FEED_TIMEOUT"])
+
+    return feed
+
+
+def _invalidate_home_feed():
+    """Remove the home page feed from the cache, after an artist, venue or show changes"""
+    cache.delete(HOME_FEED_CACHE_KEY)
+
+
 def _retrieve_recent_artists():
-    """Retrieve newly listed artists in the last 30 days"""
-    return Artist.query.filter(
-        Artist.date_listed >= datetime.now() - timedelta(30)
-    ).all()
+    """Retrieve the most recent artists listed in the last 30 days"""
+    artists = (
+        db.session.query(Artist.id, Artist.name)
+        .filter(Artist.date_listed >= datetime.now() - timedelta(30))
+        .order_by(Artist.date_listed.desc())
+        .limit(app.config["HOME_FEED_SIZE"])
+        .all()
+    )
+    return [{"id": artist.id, "name": artist.name} for artist in artists]
 
 
 def _retrieve_recent_venues():
-    """Retrieve newly listed venues in the last 30 days"""
-    return Venue.query.filter(Venue.date_listed >= datetime.now() - timedelta(30)).all()
+    """Retrieve the most recent venues listed in the last 30 days"""
+    venues = (
+        db.session.query(Venue.id, Venue.name)
+        .filter(Venue.date_listed >= datetime.now() - timedelta(30))
+        .order_by(Venue.date_listed.desc())
+        .limit(app.config["HOME_FEED_SIZE"])
+        .all()
+    )
+    return [{"id": venue.id, "name": venue.name} for venue in venues]
 
 
 def _retrieve_recent_shows():
-    """Retrieve newly listed shows in the last 30 days"""
-    shows = Show.query.filter(Show.date_listed >= datetime.now() - timedelta(30)).all()
+    """Retrieve the most recent shows listed in the last 30 days"""
+    shows = (
+        db.session.query(
+            Show.id,
+            Show.start_time,
+            Artist.id.label("artist_id"),
+            Artist.name.label("artist_name"),
+            Venue.id.label("venue_id"),
+            Venue.name.label("venue_name"),
+        )
+        .join(Artist, Artist.id == Show.artist_id)
+        .join(Venue, Venue.id == Show.venue_id)
+        .filter(Show.date_listed >= datetime.now() - timedelta(30))
+        .order_by(Show.date_listed.desc())
+        .limit(app.config["HOME_FEED_SIZE"])
+        .all()
+    )
 
     data = []
     for show in shows:
-        artist = Artist.query.filter_by(id=show.artist_id).one()
-        venue = Venue.query.filter_by(id=show.venue_id).one()
         data.append(
             {
                 "id": show.id,
                 "artist_id": show.artist_id,
-                "artist_name": artist.name,
+                "artist_name": show.artist_name,
                 "venue_id": show.venue_id,
-                "venue_name": venue.name,
-                "start_time": show.start_time.strftime("%Y-%m-%d %H:%M:%S"),
+                "venue_name": show.venue_name,
+                "start_time": show.start_time,
             }
         )
 
@@ -701,8 +1883,17 @@ def _retrieve_recent_shows():
 # ============================
 
 
+@app.errorhandler(400)
+def bad_request_error(error):
+    if request.path.startswith("/api/"):
+        return jsonify(error=error.description), 400
+    return error
+
+
 @app.errorhandler(404)
 def not_found_error(error):
+    if request.path.startswith("/api/"):
+        return jsonify(error="Not found."), 404
     return render_template("errors/404.html"), 404
 
 
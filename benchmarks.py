@@ -0,0 +1,331 @@
+import json
+import random
+import resource
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, text
+from werkzeug.datastructures import MultiDict
+
+from forms import ArtistForm, VenueForm
+from models import db, Artist, Show, Venue, adjust_show_counts
+
+
+def _routes(venue_ids, artist_ids, names, windows):
+    """
+    Read-only routes to benchmark, each with a function building the URL of its nth
+    request from sampled venue and artist ids, name prefixes and dates
+    """
+    return [
+        ("index", lambda i: "/"),
+        ("venues", lambda i: "/venues"),
+        (
+            "available_venues",
+            lambda i: "/venues/available?city=San+Francisco&state=CA"
+            f"&from={windows[i % len(windows)]}T20:00"
+            f"&to={windows[i % len(windows)]}T23:00",
+        ),
+        ("show_venue", lambda i: f"/venues/{venue_ids[i % len(venue_ids)]}"),
+        (
+            "search_venues",
+            lambda i: f"/venues/search?search_term={names[i % len(names)]}",
+        ),
+        ("edit_venue", lambda i: f"/venues/{venue_ids[i % len(venue_ids)]}/edit"),
+        ("create_venue_form", lambda i: "/venues/create"),
+        ("artists", lambda i: "/artists"),
+        ("show_artist", lambda i: f"/artists/{artist_ids[i % len(artist_ids)]}"),
+        (
+            "search_artists",
+            lambda i: f"/artists/search?search_term={names[i % len(names)]}",
+        ),
+        ("edit_artist", lambda i: f"/artists/{artist_ids[i % len(artist_ids)]}/edit"),
+        ("create_artist_form", lambda i: "/artists/create"),
+        ("shows", lambda i: "/shows"),
+        ("upcoming_shows", lambda i: f"/shows?from={date.today()}"),
+        ("create_shows", lambda i: "/shows/create"),
+        ("search_suggest", lambda i: f"/search/suggest?q={names[i % len(names)]}"),
+        ("api_venues", lambda i: "/api/v1/venues?limit=50"),
+        ("api_venue", lambda i: f"/api/v1/venues/{venue_ids[i % len(venue_ids)]}"),
+        (
+            "api_venue_shows",
+            lambda i: f"/api/v1/venues/{venue_ids[i % len(venue_ids)]}/shows",
+        ),
+        ("api_artists", lambda i: "/api/v1/artists?limit=50"),
+        (
+            "api_artist",
+            lambda i: f"/api/v1/artists/{artist_ids[i % len(artist_ids)]}",
+        ),
+        ("api_shows", lambda i: "/api/v1/shows?limit=50"),
+        ("api_upcoming_shows", lambda i: f"/api/v1/shows?limit=50&from={date.today()}"),
+    ]
+
+
+def _percentile(values, percent):
+    """Nearest-rank percentile of a list of values"""
+    ordered = sorted(values)
+    rank = max(int(round(percent / 100 * len(ordered))) - 1, 0)
+    return ordered[rank]
+
+
+def run_benchmarks(app, iterations=100, warmup=5, seed=0, routes=None):
+    """
+    Drive each read-only route with the test client, reporting p50/p95/p99 latency in
+    milliseconds and the mean number of queries per request, along with the peak RSS of
+    the process in megabytes
+    """
+    rng = random.Random(seed)
+    with app.app_context():
+        venue_ids = [id for id, in db.session.query(Venue.id).order_by(Venue.id)]
+        artist_ids = [id for id, in db.session.query(Artist.id).order_by(Artist.id)]
+        names = [name for name, in db.session.query(Artist.name).limit(1000)]
+        engine = db.get_engine()
+        db.session.remove()
+
+    venue_ids = rng.sample(venue_ids, min(len(venue_ids), 1000)) or [1]
+    artist_ids = rng.sample(artist_ids, min(len(artist_ids), 1000)) or [1]
+    names = [name.split()[0][:3] for name in rng.sample(names, len(names))] or ["a"]
+    today = date.today()
+    windows = [today + timedelta(days=rng.randint(0, 90)) for _ in range(100)]
+
+    query_count = [0]
+
+    def count_query(*args):
+        query_count[0] += 1
+
+    event.listen(engine, "before_cursor_execute", count_query)
+    client = app.test_client()
+    results = {}
+    try:
+        for name, url in _routes(venue_ids, artist_ids, names, windows):
+            if routes and name not in routes:
+                continue
+
+            for i in range(warmup):
+                client.get(url(i))
+
+            latencies = []
+            query_count[0] = 0
+            for i in range(iterations):
+                start = time.perf_counter()
+                response = client.get(url(i))
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise RuntimeError(
+                        f"{url(i)} responded with status {response.status_code}"
+                    )
+
+            results[name] = {
+                "p50": _percentile(latencies, 50),
+                "p95": _percentile(latencies, 95),
+                "p99": _percentile(latencies, 99),
+                "queries": query_count[0] / iterations,
+            }
+    finally:
+        event.remove(engine, "before_cursor_execute", count_query)
+
+    # Linux reports the maximum resident set size in kilobytes
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {"routes": results, "peak_rss_mb": peak_rss}
+
+
+def _edit_formdata(record, fields):
+    """Form data submitted by the edit form of a venue or artist, left unchanged"""
+    formdata = MultiDict({"version": record.version})
+    for name in fields:
+        value = getattr(record, name)
+        if isinstance(value, bool):
+            # Unchecked boolean fields are not submitted
+            if value:
+                formdata.add(name, "y")
+        elif isinstance(value, list):
+            for item in value:
+                formdata.add(name, item)
+        elif value is not None:
+            formdata.add(name, value)
+
+    return formdata
+
+
+def _wal_lsn(engine):
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT pg_current_wal_insert_lsn()")).scalar()
+
+
+def run_edit_benchmarks(app, iterations=100, seed=0):
+    """
+    Submit the venue and artist edit forms with the test client, both changing the phone
+    number and changing nothing, reporting p50 latency in milliseconds, the mean number
+    of queries per edit and the mean bytes of write-ahead log written per edit
+    """
+    rng = random.Random(seed)
+    with app.app_context():
+        engine = db.get_engine()
+
+    query_count = [0]
+
+    def count_query(*args):
+        query_count[0] += 1
+
+    client = app.test_client()
+    results = {}
+    for model, form_class, path in (
+        (Venue, VenueForm, "venues"),
+        (Artist, ArtistForm, "artists"),
+    ):
+        with app.app_context():
+            ids = [id for id, in db.session.query(model.id).order_by(model.id)]
+            form = form_class(formdata=None, meta={"csrf": False})
+            fields = [field.name for field in form]
+            db.session.remove()
+        ids = rng.sample(ids, min(len(ids), iterations)) or [1]
+
+        for change in (True, False):
+            latencies = []
+            queries = 0
+            wal_bytes = 0
+            for i in range(iterations):
+                record_id = ids[i % len(ids)]
+                with app.app_context():
+                    formdata = _edit_formdata(db.session.get(model, record_id), fields)
+                    db.session.remove()
+                if change:
+                    phone = formdata.get("phone")
+                    while formdata.get("phone") == phone:
+                        formdata["phone"] = f"{rng.randint(200, 999)}-555-{i:04}"
+
+                wal_start = _wal_lsn(engine)
+                event.listen(engine, "before_cursor_execute", count_query)
+                query_count[0] = 0
+                start = time.perf_counter()
+                client.post(f"/{path}/{record_id}/edit", data=formdata)
+                latencies.append((time.perf_counter() - start) * 1000)
+                event.remove(engine, "before_cursor_execute", count_query)
+                queries += query_count[0]
+
+                with engine.connect() as connection:
+                    wal_bytes += connection.execute(
+                        text(
+                            "SELECT pg_wal_lsn_diff(pg_current_wal_insert_lsn(), :lsn)"
+                        ),
+                        {"lsn": wal_start},
+                    ).scalar()
+
+            name = f"edit_{path[:-1]}" + ("" if change else "_unchanged")
+            results[name] = {
+                "p50": _percentile(latencies, 50),
+                "queries": queries / iterations,
+                "wal_bytes": float(wal_bytes) / iterations,
+            }
+
+    return results
+
+
+def _remove_shows_after(last_id):
+    """Delete the shows created by a benchmark, adjusting the show counts back"""
+    removed = db.session.execute(
+        text(
+            "DELETE FROM show WHERE id > :id RETURNING artist_id, venue_id, start_time"
+        ),
+        {"id": last_id},
+    )
+    adjust_show_counts([dict(show._mapping) for show in removed], -1)
+    db.session.commit()
+
+
+def run_batch_benchmarks(app, count=1000, batch_size=100, seed=0):
+    """
+    Create shows with the test client, both one per request through the show form and
+    in batches through the batch API, reporting the shows created per second and the
+    mean number of queries per show. The shows created are deleted afterwards.
+    """
+    rng = random.Random(seed)
+    with app.app_context():
+        venue_ids = [id for id, in db.session.query(Venue.id).order_by(Venue.id)]
+        artist_ids = [id for id, in db.session.query(Artist.id).order_by(Artist.id)]
+        last_id = db.session.query(db.func.max(Show.id)).scalar() or 0
+        engine = db.get_engine()
+        db.session.remove()
+
+    # Shows are spread four hours apart, so they never overlap one another
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(30)
+    shows = [
+        {
+            "artist_id": str(rng.choice(artist_ids)),
+            "venue_id": str(rng.choice(venue_ids)),
+            "start_time": f"{start + timedelta(hours=4 * i):%Y-%m-%d %H:%M:%S}",
+            "duration": "120",
+        }
+        for i in range(count)
+    ]
+
+    query_count = [0]
+
+    def count_query(*args):
+        query_count[0] += 1
+
+    client = app.test_client()
+    results = {}
+    for name in ("single", "batch"):
+        event.listen(engine, "before_cursor_execute", count_query)
+        query_count[0] = 0
+        began = time.perf_counter()
+        if name == "single":
+            for show in shows:
+                client.post("/shows/create", data=show)
+        else:
+            for i in range(0, count, batch_size):
+                response = client.post(
+                    "/api/shows:batch", json=shows[i : i + batch_size]
+                )
+                if response.status_code != 200:
+                    raise RuntimeError(
+                        f"Batch API responded with status {response.status_code}"
+                    )
+        elapsed = time.perf_counter() - began
+        event.remove(engine, "before_cursor_execute", count_query)
+
+        with app.app_context():
+            created = db.session.query(Show).filter(Show.id > last_id).count()
+            _remove_shows_after(last_id)
+            db.session.remove()
+        if created != count:
+            raise RuntimeError(f"Only {created} of {count} shows were created")
+
+        results[name] = {
+            "shows_per_second": count / elapsed,
+            "queries": query_count[0] / count,
+        }
+
+    return results
+
+
+def save_baseline(results, path):
+    with open(path, "w") as baseline_file:
+        json.dump(results, baseline_file, indent=2, sort_keys=True)
+
+
+def compare_to_baseline(results, path, tolerance=0.2):
+    """
+    Compare benchmark results to a stored baseline, returning descriptions of the
+    routes whose p95 latency or queries per request regressed by more than tolerance
+    """
+    with open(path) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    regressions = []
+    for name, result in results["routes"].items():
+        previous = baseline["routes"].get(name)
+        if previous is None:
+            continue
+
+        if result["p95"] > previous["p95"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {previous['p95']:.2f}ms -> {result['p95']:.2f}ms"
+            )
+        if result["queries"] > previous["queries"]:
+            regressions.append(
+                f"{name}: {previous['queries']:.1f} -> {result['queries']:.1f} "
+                "queries per request"
+            )
+
+    return regressions
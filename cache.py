@@ -0,0 +1,227 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+# Invalidations of tags are kept for longer than any fragment tagged with them, as a
+# fragment is only returned if its tags were last invalidated before it was rendered
+TAG_TIMEOUT = 30 * 24 * 60 * 60
+
+
+class MemoryCache:
+    """
+    In-process cache, storing values in a dictionary until their timeout expires. If
+    max_bytes is given, the least recently used values are evicted to keep the pickled
+    size of the cached values within it. Expired values are swept out as new values
+    are stored, at most once per default timeout.
+    """
+
+    def __init__(self, default_timeout=300, max_bytes=None):
+        self.default_timeout = default_timeout
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + default_timeout
+
+    def get(self, key):
+        """Retrieve a value from the cache, or None if it is missing or has expired"""
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+
+            value, expires, size = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+
+            self._values.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        """Retrieve a list of values from the cache, with None for each missing value"""
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, timeout=None):
+        """Store a value in the cache for timeout seconds"""
+        if timeout is None:
+            timeout = self.default_timeout
+
+        size = len(pickle.dumps(value)) if self.max_bytes is not None else 0
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._next_sweep:
+                self._sweep(now)
+
+            self._remove(key)
+            self._values[key] = (value, now + timeout, size)
+            self.size += size
+
+            while self.max_bytes is not None and self.size > self.max_bytes:
+                self._remove(next(iter(self._values)))
+
+    def delete(self, key):
+        """Remove a value from the cache"""
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        """Remove all values from the cache"""
+        with self._lock:
+            self._values.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        entry = self._values.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def _sweep(self, now):
+        expired = [
+            key for key, (_, expires, _) in self._values.items() if expires < now
+        ]
+        for key in expired:
+            self._remove(key)
+        self._next_sweep = now + self.default_timeout
+
+
+class RedisCache:
+    """
+    Cache shared between application processes, backed by Redis. Requires the optional
+    redis package to be installed.
+    """
+
+    def __init__(self, url, default_timeout=300, prefix="fyyur:"):
+        import redis
+
+        self.default_timeout = default_timeout
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        """Retrieve a value from the cache, or None if it is missing or has expired"""
+        value = self._client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def get_many(self, keys):
+        """Retrieve a list of values from the cache, with None for each missing value"""
+        values = self._client.mget([self.prefix + key for key in keys]) if keys else []
+        return [None if value is None else pickle.loads(value) for value in values]
+
+    def set(self, key, value, timeout=None):
+        """Store a value in the cache for timeout seconds"""
+        if timeout is None:
+            timeout = self.default_timeout
+
+        self._client.set(self.prefix + key, pickle.dumps(value), ex=timeout)
+
+    def delete(self, key):
+        """Remove a value from the cache"""
+        self._client.delete(self.prefix + key)
+
+    def clear(self):
+        """Remove all values with this cache's prefix from the cache"""
+        keys = list(self._client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
+
+
+class FragmentCache:
+    """
+    Cache of rendered page fragments, each tagged with the entities it depends on, such
+    as "artist:3". Invalidating a tag discards every fragment tagged with it. The time
+    each tag was last invalidated is stored in the backend, and a fragment is only
+    returned if none of its tags were invalidated since it started being rendered, so
+    a fragment rendered from data read before an invalidation is never returned after
+    it. Times are compared between processes, so their clocks must be synchronized.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def start(self, lag=0):
+        """
+        Start rendering a fragment, returning the time to store it with. lag is how many
+        seconds behind the primary database the data it is rendered from may be.
+        """
+        return time.time() - lag
+
+    def get(self, key):
+        """Retrieve a fragment, or None if it is missing or one of its tags has changed"""
+        entry = self.backend.get(f"fragment:{key}")
+        if entry is not None:
+            value, started, tags = entry
+            if not self._invalidated_since(started, tags):
+                self.hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    def set(self, key, value, started, tags=(), timeout=None):
+        """
+        Store a fragment rendered from data read after started for timeout seconds,
+        tagged with the entities it depends on. The fragment is not stored if one of its
+        tags was invalidated since it started being rendered.
+        """
+        tags = list(dict.fromkeys([f"fragment:{key}", *tags]))
+        if not self._invalidated_since(started, tags):
+            self.backend.set(f"fragment:{key}", (value, started, tags), timeout)
+
+    def delete(self, *keys):
+        """
+        Remove fragments from the cache, including any being rendered from data read
+        before they were removed
+        """
+        self.invalidate(*(f"fragment:{key}" for key in keys))
+        for key in keys:
+            self.backend.delete(f"fragment:{key}")
+
+    def invalidate(self, *tags):
+        """Discard every fragment tagged with any of the given tags"""
+        now = time.time()
+        for tag in tags:
+            self.backend.set(f"tag:{tag}", now, timeout=TAG_TIMEOUT)
+
+    def _invalidated_since(self, started, tags):
+        invalidated = self.backend.get_many([f"tag:{tag}" for tag in tags])
+        return any(at is not None and at >= started for at in invalidated)
+
+
+def create_cache(config):
+    """
+    Create the cache configured for the application: shared via Redis if CACHE_REDIS_URL
+    is set, otherwise an in-process cache evicting the least recently used values beyond
+    CACHE_MAX_BYTES
+    """
+    if config.get("CACHE_REDIS_URL"):
+        return RedisCache(
+            config["CACHE_REDIS_URL"], default_timeout=config["CACHE_DEFAULT_TIMEOUT"]
+        )
+
+    return MemoryCache(
+        default_timeout=config["CACHE_DEFAULT_TIMEOUT"],
+        max_bytes=config["CACHE_MAX_BYTES"],
+    )
+
+
+def create_fragment_cache(config):
+    """
+    Create the rendered fragment cache configured for the application: shared via Redis
+    if CACHE_REDIS_URL is set, otherwise an in-process cache evicting the least recently
+    used fragments beyond FRAGMENT_CACHE_MAX_BYTES
+    """
+    if config.get("CACHE_REDIS_URL"):
+        backend = RedisCache(
+            config["CACHE_REDIS_URL"], default_timeout=config["FRAGMENT_CACHE_TIMEOUT"]
+        )
+    else:
+        backend = MemoryCache(
+            default_timeout=config["FRAGMENT_CACHE_TIMEOUT"],
+            max_bytes=config["FRAGMENT_CACHE_MAX_BYTES"],
+        )
+
+    return FragmentCache(backend)
@@ -0,0 +1,497 @@
+import json
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import pass_script_info, with_appcontext
+from sqlalchemy import cast, func, text
+from sqlalchemy.exc import IntegrityError
+
+from benchmarks import (
+    compare_to_baseline,
+    run_batch_benchmarks,
+    run_benchmarks,
+    run_edit_benchmarks,
+    save_baseline,
+)
+from dataset import DatasetGenerator, reset_database
+from exporter import EXPORTS, FORMATS, export
+from formatting import benchmark_formatting
+from importer import IMPORTS, import_file, read_csv, read_ndjson
+from metrics import benchmark_overhead
+from models import (
+    db,
+    Artist,
+    MAX_SHOW_DURATION,
+    Show,
+    ShowSeries,
+    Venue,
+    refresh_show_counts,
+)
+from partitions import (
+    DEFAULT_PARTITION,
+    allow_double_booking,
+    create_partitions,
+    detach_partitions,
+    list_partitions,
+    partition_name,
+    prevent_double_booking,
+)
+
+
+# ====================
+#  Index checks
+# ====================
+
+
+def _hot_path_queries():
+    """
+    Representative queries for each hot path in the application, paired with the
+    index the planner is expected to use for them.
+    """
+    now = datetime.now()
+    last_month = now - timedelta(30)
+    tomorrow = now + timedelta(1)
+
+    return [
+        (
+            "upcoming shows for a venue",
+            "ix_show_venue_id_start_time",
+            Show.query.filter(Show.venue_id == 1, Show.start_time >= now),
+        ),
+        (
+            "upcoming shows for an artist",
+            "ix_show_artist_id_start_time",
+            Show.query.filter(Show.artist_id == 1, Show.start_time >= now),
+        ),
+        (
+            "shows in chronological order",
+            "ix_show_start_time_id",
+            Show.query.order_by(Show.start_time, Show.id).limit(50),
+        ),
+        (
+            "artists in alphabetical order",
+            "ix_artist_name_id",
+            Artist.query.order_by(Artist.name, Artist.id).limit(50),
+        ),
+        (
+            "recently listed artists",
+            "ix_artist_date_listed",
+            Artist.query.filter(Artist.date_listed >= last_month),
+        ),
+        (
+            "recently listed venues",
+            "ix_venue_date_listed",
+            Venue.query.filter(Venue.date_listed >= last_month),
+        ),
+        (
+            "recently listed shows",
+            "ix_show_date_listed",
+            Show.query.filter(Show.date_listed >= last_month),
+        ),
+        (
+            "venues in a city",
+            "ix_venue_city_state",
+            Venue.query.filter_by(city="San Francisco", state="CA"),
+        ),
+        (
+            "artists by genre",
+            "ix_artist_genre_ids",
+            Artist.query.filter(
+                Artist.genre_ids.contains(cast([11], Artist.genre_ids.type))
+            ),
+        ),
+        (
+            "venues by genre",
+            "ix_venue_genre_ids",
+            Venue.query.filter(
+                Venue.genre_ids.contains(cast([11], Venue.genre_ids.type))
+            ),
+        ),
+        (
+            "shows during a time window",
+            "ix_show_during",
+            Show.query.filter(
+                Show.during.overlaps(func.tsrange(now, tomorrow)),
+                Show.start_time < tomorrow,
+                Show.start_time > now - timedelta(minutes=MAX_SHOW_DURATION),
+            ),
+        ),
+        (
+            "show series repeating during a time window",
+            "ix_show_series_period",
+            ShowSeries.query.filter(
+                ShowSeries.period.overlaps(func.tsrange(now, tomorrow))
+            ),
+        ),
+        (
+            "show series at a venue",
+            "ix_show_series_venue_id",
+            ShowSeries.query.filter(ShowSeries.venue_id == 1),
+        ),
+        (
+            "artists by name",
+            "ix_artist_name_trgm",
+            Artist.query.filter(Artist.name.ilike("%sax%")),
+        ),
+        (
+            "venues by name",
+            "ix_venue_name_trgm",
+            Venue.query.filter(Venue.name.ilike("%music%")),
+        ),
+    ]
+
+
+@click.command("check-indexes")
+@click.option(
+    "--allow-seqscan",
+    is_flag=True,
+    help="Let the planner choose sequential scans, as it would on a small dataset.",
+)
+@with_appcontext
+def check_indexes_command(allow_seqscan):
+    """
+    Run EXPLAIN against the hot query paths and check the planner uses their indexes.
+    """
+    failures = 0
+    with db.engine.connect() as connection:
+        # On a small dataset a sequential scan is always cheapest, so by default
+        # discourage it to check that the index is usable at all
+        if not allow_seqscan:
+            connection.execute(text("SET enable_seqscan = off"))
+
+        for description, index_name, query in _hot_path_queries():
+            statement = query.statement.compile(dialect=connection.dialect)
+            plan = "\n".join(
+                row[0]
+                for row in connection.exec_driver_sql(
+                    f"EXPLAIN {statement}", statement.params
+                )
+            )
+            # Partitioned indexes are scanned through the index of each partition
+            partition_indexes = connection.execute(
+                text(
+                    "SELECT child.relname FROM pg_inherits "
+                    "JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid "
+                    "WHERE pg_inherits.inhparent = to_regclass(:index_name)"
+                ),
+                {"index_name": index_name},
+            ).scalars()
+            uses_index = any(name in plan for name in [index_name, *partition_indexes])
+            failures += not uses_index
+
+            click.echo(
+                f"[{'ok' if uses_index else 'MISSING'}] {description}: {index_name}"
+            )
+            if not uses_index:
+                click.echo(plan)
+
+    if failures:
+        raise click.ClickException(f"{failures} queries did not use their index.")
+
+
+# ====================
+#  Show counts
+# ====================
+
+
+@click.command("refresh-show-counts")
+@with_appcontext
+def refresh_show_counts_command():
+    """
+    Recalculate upcoming and past show counts, to be run periodically (e.g. via cron).
+    """
+    refresh_show_counts()
+    click.echo("Upcoming and past show counts refreshed.")
+
+
+# ====================
+#  Metrics
+# ====================
+
+
+@click.command("benchmark-metrics")
+@click.option("--iterations", default=100000, help="Number of observations to time.")
+def benchmark_metrics_command(iterations):
+    """
+    Measure the overhead of recording a metric observation.
+    """
+    overhead = benchmark_overhead(iterations)
+    click.echo(f"Recording an observation takes {overhead * 1e6:.2f}µs on average.")
+
+
+@click.command("benchmark-formatting")
+@click.option("--rows", default=1000, help="Number of show start times to format.")
+@click.option("--iterations", default=10, help="Number of times to format them.")
+def benchmark_formatting_command(rows, iterations):
+    """
+    Measure the cost per row of formatting show start times on a page.
+    """
+    results = benchmark_formatting(rows, iterations)
+    for name, duration in results.items():
+        click.echo(f"{name:>10}: {duration * 1e6:.2f}µs per row")
+
+
+# ====================
+#  Benchmarking
+# ====================
+
+
+@click.command("seed")
+@click.option("--venues", default=10000, help="Number of venues to generate.")
+@click.option("--artists", default=50000, help="Number of artists to generate.")
+@click.option("--shows", default=1000000, help="Number of shows to generate.")
+@click.option("--seed", default=0, help="Seed for the random number generator.")
+@click.option(
+    "--reset", is_flag=True, help="Delete all venues, artists and shows first."
+)
+@with_appcontext
+def seed_command(venues, artists, shows, seed, reset):
+    """
+    Generate a deterministic synthetic dataset of venues, artists and shows.
+    """
+    if reset:
+        reset_database()
+
+    start = time.perf_counter()
+    DatasetGenerator(seed).generate(venues, artists, shows, echo=click.echo)
+    click.echo(f"Dataset generated in {time.perf_counter() - start:.1f}s.")
+
+
+@click.command("benchmark")
+@click.option("--iterations", default=100, help="Number of requests per route.")
+@click.option("--warmup", default=5, help="Number of untimed requests per route.")
+@click.option("--route", "routes", multiple=True, help="Only benchmark these routes.")
+@click.option("--save", type=click.Path(), help="Save the results as a baseline.")
+@click.option(
+    "--compare", type=click.Path(exists=True), help="Compare the results to a baseline."
+)
+@click.option(
+    "--tolerance", default=0.2, help="Allowed fractional increase in p95 latency."
+)
+@pass_script_info
+def benchmark_command(info, iterations, warmup, routes, save, compare, tolerance):
+    """
+    Benchmark the latency and queries per request of each read-only route.
+    """
+    # Load the app without pushing an app context, so each request gets its own
+    results = run_benchmarks(info.load_app(), iterations, warmup, routes=routes)
+
+    click.echo(f"{'route':<20} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8}")
+    for name, result in results["routes"].items():
+        click.echo(
+            f"{name:<20} {result['p50']:>7.2f}ms {result['p95']:>7.2f}ms "
+            f"{result['p99']:>7.2f}ms {result['queries']:>8.1f}"
+        )
+    click.echo(f"Peak RSS: {results['peak_rss_mb']:.1f}MB")
+
+    if save:
+        save_baseline(results, save)
+    if compare:
+        regressions = compare_to_baseline(results, compare, tolerance)
+        for regression in regressions:
+            click.echo(f"Regression in {regression}")
+        if regressions:
+            raise click.ClickException(f"{len(regressions)} regressions found.")
+
+
+@click.command("benchmark-edits")
+@click.option("--iterations", default=100, help="Number of edits of each kind.")
+@pass_script_info
+def benchmark_edits_command(info, iterations):
+    """
+    Benchmark the latency, queries and write-ahead log volume of venue and artist edits.
+
+    Edits are written to the database, so only run this against a benchmark dataset.
+    """
+    results = run_edit_benchmarks(info.load_app(), iterations)
+
+    click.echo(f"{'edit':<24} {'p50':>9} {'queries':>8} {'WAL':>9}")
+    for name, result in results.items():
+        click.echo(
+            f"{name:<24} {result['p50']:>7.2f}ms {result['queries']:>8.1f} "
+            f"{result['wal_bytes']:>8.0f}B"
+        )
+
+
+@click.command("benchmark-batch")
+@click.option("--count", default=1000, help="Number of shows created by each path.")
+@click.option("--batch-size", default=100, help="Number of shows in each batch.")
+@pass_script_info
+def benchmark_batch_command(info, count, batch_size):
+    """
+    Benchmark the throughput of creating shows one per request and with the batch API.
+
+    Shows are written to the database and deleted again, so only run this against a
+    benchmark dataset.
+    """
+    results = run_batch_benchmarks(info.load_app(), count, batch_size)
+
+    click.echo(f"{'path':<8} {'shows/s':>9} {'queries':>8}")
+    for name, result in results.items():
+        click.echo(
+            f"{name:<8} {result['shows_per_second']:>9.1f} {result['queries']:>8.2f}"
+        )
+
+
+# ====================
+#  Import
+# ====================
+
+
+@click.command("import")
+@click.argument("kind", type=click.Choice(list(IMPORTS)))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(["csv", "ndjson"]),
+    help="Format of the file, detected from its extension by default.",
+)
+@click.option("--chunk-size", default=5000, help="Number of rows loaded at a time.")
+@click.option(
+    "--rejects",
+    type=click.File("w"),
+    help="Write rejected rows and their errors to this file as NDJSON.",
+)
+@with_appcontext
+def import_command(kind, path, file_format, chunk_size, rejects):
+    """
+    Bulk import artists, venues or shows from a CSV or NDJSON file.
+
+    Rows are validated with the same rules as the web forms. Rows with an id replace
+    the existing record with that id, and genres in CSV files are separated by semicolons.
+    """
+    if file_format is None:
+        file_format = "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+    rows = read_ndjson(path) if file_format == "ndjson" else read_csv(path)
+
+    def on_reject(line, errors):
+        if rejects:
+            rejects.write(json.dumps({"line": line, "errors": errors}) + "\n")
+
+    def on_progress(stats):
+        click.echo(
+            f"{stats.imported} imported, {stats.rejected} rejected "
+            f"({stats.rows_per_second:.0f} rows/s)"
+        )
+
+    stats = import_file(kind, rows, chunk_size, on_reject, on_progress)
+    click.echo(
+        f"Imported {stats.imported} {kind} and rejected {stats.rejected} "
+        f"at {stats.rows_per_second:.0f} rows/s."
+    )
+
+
+# ====================
+#  Export
+# ====================
+
+
+@click.command("export")
+@click.argument("kind", type=click.Choice(list(EXPORTS)))
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(list(FORMATS)),
+    default="ndjson",
+    help="Format to export in.",
+)
+@click.option(
+    "--output",
+    type=click.File("w"),
+    default="-",
+    help="File to write to, standard output by default.",
+)
+@with_appcontext
+def export_command(kind, file_format, output):
+    """
+    Export every show, artist or venue as NDJSON or CSV.
+
+    Rows are streamed from a server-side cursor, so memory use stays constant however
+    many rows are exported. Exported artists and venues can be imported again.
+    """
+    for line in export(kind, file_format):
+        output.write(line)
+
+
+# ====================
+#  Double booking
+# ====================
+
+
+@click.command("prevent-double-booking")
+@click.option(
+    "--allow", is_flag=True, help="Remove the constraint, allowing double bookings."
+)
+@with_appcontext
+def prevent_double_booking_command(allow):
+    """
+    Add an exclusion constraint preventing shows at the same venue from overlapping.
+
+    The constraint is added to each partition of the show table, and to partitions
+    created later, so only shows starting in the same month are compared. Adding the
+    constraint fails if any venue is already double booked.
+    """
+    partitions = [partition_name(month) for month in list_partitions()]
+    partitions.append(DEFAULT_PARTITION)
+
+    if allow:
+        for partition in partitions:
+            allow_double_booking(partition)
+        db.session.commit()
+        click.echo("Venues can be double booked.")
+        return
+
+    try:
+        for partition in partitions:
+            allow_double_booking(partition)
+            prevent_double_booking(partition)
+        db.session.commit()
+    except IntegrityError as error:
+        db.session.rollback()
+        raise click.ClickException(
+            f"Some venues are already double booked: {error.orig}"
+        )
+
+    click.echo("Venues can no longer be double booked.")
+
+
+# ====================
+#  Partitions
+# ====================
+
+
+@click.command("partitions")
+@click.option(
+    "--months-ahead",
+    default=12,
+    show_default=True,
+    help="Number of months ahead to create partitions for.",
+)
+@click.option(
+    "--keep-months",
+    type=int,
+    help="Detach the partitions for months before this many months ago.",
+)
+@with_appcontext
+def partitions_command(months_ahead, keep_months):
+    """
+    Create the monthly partitions of the show table for the coming months, to be run
+    periodically (e.g. via cron), and optionally archive old partitions.
+
+    Detached partitions are renamed to archived_show_YYYY_MM and kept, but their shows
+    are no longer listed or counted.
+    """
+    for month in create_partitions(months_ahead):
+        click.echo(f"Created {partition_name(month)}.")
+
+    if keep_months is not None:
+        for month in detach_partitions(keep_months):
+            click.echo(f"Archived {partition_name(month)}.")
+
+    partitions = list_partitions()
+    if partitions:
+        click.echo(
+            f"Shows are partitioned from {partitions[0]:%Y-%m} to {partitions[-1]:%Y-%m}."
+        )
@@ -0,0 +1,187 @@
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import text
+
+from forms import ArtistForm
+from models import db, Artist, Show, Venue, refresh_show_counts
+
+# Cities weighted roughly by the size of their live music scene
+CITIES = [
+    ("New York", "NY", 20),
+    ("Los Angeles", "CA", 15),
+    ("San Francisco", "CA", 10),
+    ("Chicago", "IL", 10),
+    ("Austin", "TX", 8),
+    ("Nashville", "TN", 8),
+    ("Seattle", "WA", 6),
+    ("New Orleans", "LA", 6),
+    ("Boston", "MA", 5),
+    ("Denver", "CO", 5),
+    ("Atlanta", "GA", 4),
+    ("Portland", "OR", 3),
+    ("Minneapolis", "MN", 3),
+    ("Philadelphia", "PA", 3),
+    ("Detroit", "MI", 2),
+    ("Memphis", "TN", 2),
+]
+CITY_CUM_WEIGHTS = list(accumulate(weight for _, _, weight in CITIES))
+
+# Genres from the artist form, with the most popular genres weighted more heavily
+GENRES = [value for value, _ in ArtistForm.genres.kwargs["choices"]]
+GENRE_WEIGHTS = [
+    {"Rock n Roll": 8, "Pop": 8, "Hip-Hop": 6, "Electronic": 5, "Jazz": 4}.get(genre, 2)
+    for genre in GENRES
+]
+
+ADJECTIVES = (
+    "Blue Electric Golden Velvet Midnight Crimson Wild Silver Neon Broken Lucky Hollow "
+    "Rusty Cosmic Quiet Burning"
+).split()
+ARTIST_NOUNS = (
+    "Petals Wolves Echoes Rebels Lanterns Saints Ravens Tides Strangers Engines "
+    "Dreamers Horns Satellites Foxes"
+).split()
+VENUE_NOUNS = (
+    "Hall Lounge Room Theatre Club Tavern Cellar Ballroom Garden Warehouse Bar Stage"
+).split()
+
+CHUNK_SIZE = 10000
+
+
+class DatasetGenerator:
+    """
+    Generates a synthetic dataset of venues, artists and shows around a given date. The
+    same seed and date always generate the same dataset, given an empty database.
+    """
+
+    def __init__(self, seed=0, now=None):
+        self.rng = random.Random(seed)
+        self.now = now or datetime.combine(datetime.now().date(), datetime.min.time())
+
+    def generate(self, venues, artists, shows, echo=print):
+        self._insert(Venue.__table__, self._venues(venues), venues, echo)
+        self._insert(Artist.__table__, self._artists(artists), artists, echo)
+
+        venue_ids = [id for id, in db.session.query(Venue.id).order_by(Venue.id)]
+        artist_ids = [id for id, in db.session.query(Artist.id).order_by(Artist.id)]
+        self._insert(
+            Show.__table__, self._shows(shows, venue_ids, artist_ids), shows, echo
+        )
+
+        # Shows are inserted in bulk, bypassing the events which maintain show counts
+        refresh_show_counts()
+
+    def _insert(self, table, rows, total, echo):
+        """Insert the generated rows in chunks, using multi-row inserts"""
+        chunk = []
+        inserted = 0
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == CHUNK_SIZE:
+                db.session.execute(table.insert(), chunk)
+                inserted += len(chunk)
+                chunk = []
+                echo(f"{table.name}: {inserted}/{total}")
+
+        if chunk:
+            db.session.execute(table.insert(), chunk)
+            echo(f"{table.name}: {total}/{total}")
+
+        db.session.commit()
+
+    def _city(self):
+        city, state, _ = self.rng.choices(CITIES, cum_weights=CITY_CUM_WEIGHTS)[0]
+        return city, state
+
+    def _genres(self):
+        genres = self.rng.choices(
+            GENRES, weights=GENRE_WEIGHTS, k=self.rng.randint(1, 3)
+        )
+        return sorted(set(genres))
+
+    def _phone(self):
+        area, exchange, line = (
+            self.rng.randint(200, 999),
+            self.rng.randint(100, 999),
+            self.rng.randint(1000, 9999),
+        )
+        return f"{area}-{exchange}-{line}"
+
+    def _date_listed(self):
+        return self.now - timedelta(days=self.rng.expovariate(1 / 365))
+
+    def _venues(self, count):
+        for i in range(count):
+            city, state = self._city()
+            name = f"The {self.rng.choice(ADJECTIVES)} {self.rng.choice(VENUE_NOUNS)}"
+            yield {
+                "name": f"{name} {i + 1}",
+                "city": city,
+                "state": state,
+                "address": f"{self.rng.randint(1, 9999)} Main Street",
+                "phone": self._phone(),
+                "genres": self._genres(),
+                "seeking_talent": self.rng.random() < 0.3,
+                "seeking_description": None,
+                "date_listed": self._date_listed(),
+            }
+
+    def _artists(self, count):
+        for i in range(count):
+            city, state = self._city()
+            name = f"{self.rng.choice(ADJECTIVES)} {self.rng.choice(ARTIST_NOUNS)}"
+            yield {
+                "name": f"{name} {i + 1}",
+                "city": city,
+                "state": state,
+                "phone": self._phone(),
+                "genres": self._genres(),
+                "seeking_venue": self.rng.random() < 0.4,
+                "seeking_description": None,
+                "date_listed": self._date_listed(),
+            }
+
+    def _shows(self, count, venue_ids, artist_ids):
+        # A few popular artists and venues host most of the shows
+        venue_weights = list(
+            accumulate(1 / (rank + 1) for rank in range(len(venue_ids)))
+        )
+        artist_weights = list(
+            accumulate(1 / (rank + 1) for rank in range(len(artist_ids)))
+        )
+        venue_ids = self.rng.sample(venue_ids, len(venue_ids))
+        artist_ids = self.rng.sample(artist_ids, len(artist_ids))
+
+        for _ in range(count):
+            # Shows span the last two years and the coming year, in the evening and
+            # more often at the weekend
+            day = self.now.date() + timedelta(days=self.rng.randint(-730, 365))
+            if day.weekday() < 4 and self.rng.random() < 0.5:
+                day += timedelta(days=4 - day.weekday() + self.rng.randint(0, 2))
+            start_time = datetime(
+                day.year, day.month, day.day, self.rng.randint(18, 23)
+            ) + timedelta(minutes=self.rng.choice((0, 15, 30, 45)))
+
+            (venue_id,) = self.rng.choices(venue_ids, cum_weights=venue_weights)
+            (artist_id,) = self.rng.choices(artist_ids, cum_weights=artist_weights)
+            yield {
+                "venue_id": venue_id,
+                "artist_id": artist_id,
+                "start_time": start_time,
+                "date_listed": min(
+                    start_time - timedelta(days=self.rng.randint(1, 90)), self.now
+                ),
+            }
+
+
+def reset_database():
+    """Remove all venues, artists, shows and show series, restarting their ids"""
+    db.session.execute(
+        text(
+            "TRUNCATE show_series_exception, show_series, show, artist, venue "
+            "RESTART IDENTITY"
+        )
+    )
+    db.session.commit()
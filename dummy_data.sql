@@ -15,7 +15,9 @@ VALUES
 INSERT INTO show (artist_id, venue_id, start_time, date_listed)
 VALUES
 (1, 1, '2020-05-21T21:30:00.000Z', '2019-07-21T21:30:00.000Z'),
-(2, 3, '2020-06-15T23:00:00.000Z', '2019-07-21T21:30:00.000Z'),
-(3, 3, '2035-04-01T20:00:00.000Z', '2022-07-29T21:30:00.000Z'),
-(3, 3, '2035-04-08T20:00:00.000Z', '2022-07-29T21:30:00.000Z'),
-(3, 3, '2035-04-15T20:00:00.000Z', '2022-07-29T21:30:00.000Z');
+(2, 3, '2020-06-15T23:00:00.000Z', '2019-07-21T21:30:00.000Z');
+
+
+INSERT INTO show_series (artist_id, venue_id, start_time, recurrence, period, date_listed)
+VALUES
+(3, 3, '2035-04-01T20:00:00.000Z', 'FREQ=WEEKLY;COUNT=3', '[2035-04-01 20:00, 2035-04-15 20:00]', '2022-07-29T21:30:00.000Z');
@@ -0,0 +1,150 @@
+import csv
+import heapq
+import io
+import json
+
+from flask import current_app
+from sqlalchemy import null, true
+
+from importer import GENRE_SEPARATOR
+from models import db, Artist, Show, Venue, series_in_window
+
+# Number of rows fetched from the server-side cursor at a time
+BATCH_SIZE = 1000
+
+
+def _shows():
+    return (
+        db.session.query(
+            Show.id,
+            null().label("series_id"),
+            Show.start_time,
+            Show.duration,
+            Show.artist_id,
+            Artist.name.label("artist_name"),
+            Show.venue_id,
+            Venue.name.label("venue_name"),
+        )
+        .join(Artist, Artist.id == Show.artist_id)
+        .join(Venue, Venue.id == Show.venue_id)
+        .order_by(Show.start_time, Show.id)
+    )
+
+
+def _artists():
+    return db.session.query(
+        Artist.id,
+        Artist.name,
+        Artist.genres,
+        Artist.city,
+        Artist.state,
+        Artist.phone,
+        Artist.website_link,
+        Artist.facebook_link,
+        Artist.image_link,
+        Artist.seeking_venue,
+        Artist.seeking_description,
+    ).order_by(Artist.id)
+
+
+def _venues():
+    return db.session.query(
+        Venue.id,
+        Venue.name,
+        Venue.genres,
+        Venue.address,
+        Venue.city,
+        Venue.state,
+        Venue.phone,
+        Venue.website_link,
+        Venue.facebook_link,
+        Venue.image_link,
+        Venue.seeking_talent,
+        Venue.seeking_description,
+    ).order_by(Venue.id)
+
+
+EXPORTS = {"shows": _shows, "artists": _artists, "venues": _venues}
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _show_sort_key(show):
+    """Order shows by start time, and occurrences of show series after shows"""
+    if show["id"] is None:
+        return show["start_time"], 1, show["series_id"]
+    return show["start_time"], 0, show["id"]
+
+
+def _occurrences(row, days_ahead):
+    series = row.ShowSeries
+    for start_time, duration, _ in series.occurrences(end=series.horizon(days_ahead)):
+        yield {
+            "id": None,
+            "series_id": series.id,
+            "start_time": start_time,
+            "duration": duration,
+            "artist_id": series.artist_id,
+            "artist_name": row.artist_name,
+            "venue_id": series.venue_id,
+            "venue_name": row.venue_name,
+        }
+
+
+def _series_occurrences():
+    """
+    Expand the occurrences of every show series in order of start time, as far ahead as
+    they are listed on venue and artist pages. The series are held in memory, as they
+    are far fewer than shows.
+    """
+    days_ahead = current_app.config["SHOW_SERIES_DAYS_AHEAD"]
+    return heapq.merge(
+        *(_occurrences(row, days_ahead) for row in series_in_window(true())),
+        key=_show_sort_key,
+    )
+
+
+def export_rows(kind):
+    """
+    Stream every show, artist or venue from a server-side cursor, fetching BATCH_SIZE
+    rows at a time so memory use stays constant however many rows there are. Shows are
+    merged with the occurrences of show series, which have a series id instead of an id.
+    """
+    rows = (row._asdict() for row in EXPORTS[kind]().yield_per(BATCH_SIZE))
+    if kind == "shows":
+        rows = heapq.merge(rows, _series_occurrences(), key=_show_sort_key)
+    yield from rows
+
+
+def json_value(value):
+    """Encode values which JSON does not support, with datetimes in ISO 8601 format"""
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def to_ndjson(rows):
+    """Encode rows as newline-delimited JSON, one line at a time"""
+    for row in rows:
+        yield json.dumps(row, default=json_value) + "\n"
+
+
+def to_csv(rows):
+    """Encode rows as CSV with a header row, one line at a time"""
+    buffer = io.StringIO()
+    writer = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(row))
+            writer.writeheader()
+
+        if row.get("genres") is not None:
+            row["genres"] = GENRE_SEPARATOR.join(row["genres"])
+        writer.writerow(row)
+
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def export(kind, file_format):
+    """Stream every show, artist or venue encoded in the given format"""
+    encode = to_ndjson if file_format == "ndjson" else to_csv
+    return encode(export_rows(kind))
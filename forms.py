@@ -4,11 +4,19 @@ from flask_wtf import Form
 from wtforms import (
     BooleanField,
     DateTimeField,
+    IntegerField,
     SelectField,
     SelectMultipleField,
     StringField,
 )
-from wtforms.validators import URL, DataRequired, Length, Optional, Regexp
+from wtforms.validators import (
+    URL,
+    DataRequired,
+    Length,
+    NumberRange,
+    Optional,
+    Regexp,
+)
 
 invalid_url_message = "This is not a valid link, make sure you enter the entire URL"
 
@@ -78,7 +86,7 @@ class ArtistForm(Form):
         validators=[
             DataRequired(),
             Length(min=9, max=13),
-            Regexp(regex="^[+-]?[0-9]$"),
+            Regexp(regex="^[+-]?[0-9-]+$"),
         ],
     )
     image_link = StringField(
@@ -197,7 +205,7 @@ class VenueForm(Form):
         validators=[
             DataRequired(),
             Length(min=9, max=13),
-            Regexp(regex="^[+-]?[0-9]$"),
+            Regexp(regex="^[+-]?[0-9-]+$"),
         ],
     )
     image_link = StringField(
@@ -248,3 +256,15 @@ class ShowForm(Form):
     start_time = DateTimeField(
         "start_time", validators=[DataRequired()], default=datetime.today()
     )
+    # Length of the show in minutes
+    duration = IntegerField(
+        "duration",
+        validators=[DataRequired(), NumberRange(min=1, max=24 * 60)],
+        default=180,
+    )
+
+
+class ShowSeriesForm(ShowForm):
+    # Optional recurrence in the RRULE format, e.g. FREQ=WEEKLY;COUNT=104, which lists
+    # the show as a series repeating on it rather than as a single show
+    recurrence = StringField("recurrence", validators=[Optional(), Length(max=500)])
@@ -0,0 +1,49 @@
+import functools
+import hashlib
+
+from flask import current_app, make_response, request
+from werkzeug.http import is_resource_modified
+
+
+def conditional(version):
+    """
+    Answer conditional GET requests for a view with 304 Not Modified, without calling
+    the view, while the version of its page is unchanged. version is called with the
+    view's arguments, and returns the values the page depends on, such as when its rows
+    were last modified and how many there are, or None if the page does not exist. Only
+    an ETag is sent, as a Last-Modified time would not change when rows are deleted.
+
+    Responses may be stored by shared caches, which revalidate them after
+    HTTP_CACHE_MAX_AGE seconds. Clients with a session, which may hold flashed messages
+    for them, are always sent a fresh, private response, so responses vary by cookie.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            if current_app.session_cookie_name in request.cookies:
+                response = make_response(view(**kwargs))
+                response.cache_control.private = True
+                response.cache_control.no_store = True
+                response.vary.add("Cookie")
+                return response
+
+            validators = version(**kwargs)
+            if validators is None:
+                return view(**kwargs)
+
+            etag = hashlib.sha1(repr(tuple(validators)).encode()).hexdigest()
+            if is_resource_modified(request.environ, etag=etag):
+                response = make_response(view(**kwargs))
+            else:
+                response = current_app.response_class(status=304)
+
+            response.set_etag(etag, weak=True)
+            response.cache_control.public = True
+            response.cache_control.max_age = current_app.config["HTTP_CACHE_MAX_AGE"]
+            response.vary.add("Cookie")
+            return response
+
+        return wrapper
+
+    return decorator
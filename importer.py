@@ -0,0 +1,300 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+
+from sqlalchemy import insert, select
+from werkzeug.datastructures import MultiDict
+from wtforms import BooleanField
+
+from forms import ArtistForm, ShowForm, VenueForm
+from models import db, Artist, Show, Venue, adjust_show_counts, refresh_show_counts
+
+IMPORTS = {
+    "artists": (Artist, ArtistForm),
+    "venues": (Venue, VenueForm),
+    "shows": (Show, ShowForm),
+}
+
+# Separator between multiple genres in a single CSV field
+GENRE_SEPARATOR = ";"
+
+FALSE_VALUES = ("", "0", "false", "n", "no")
+
+
+class ImportStats:
+    """
+    Number of rows imported and rejected so far, and the rate they were processed at
+    """
+
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        self.start = time.perf_counter()
+
+    @property
+    def rows_per_second(self):
+        return (self.imported + self.rejected) / (time.perf_counter() - self.start)
+
+
+def read_csv(path):
+    """Stream the rows of a CSV file with a header row"""
+    with open(path, newline="") as csv_file:
+        for row in csv.DictReader(csv_file):
+            if row.get("genres"):
+                row["genres"] = row["genres"].split(GENRE_SEPARATOR)
+            yield row
+
+
+def read_ndjson(path):
+    """Stream the rows of a newline-delimited JSON file"""
+    with open(path) as ndjson_file:
+        for line in ndjson_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _formdata(row, boolean_fields):
+    """Convert an input row to form data, as it would be submitted by the web forms"""
+    formdata = MultiDict()
+    for key, value in row.items():
+        if key == "id" or value is None:
+            continue
+
+        if key in boolean_fields:
+            # Unchecked boolean fields are not submitted by the web forms
+            if value is False or str(value).lower() in FALSE_VALUES:
+                continue
+            value = "y"
+
+        for item in value if isinstance(value, list) else [value]:
+            formdata.add(key, str(item))
+
+    return formdata
+
+
+def _validate(form_class, boolean_fields, row):
+    """
+    Validate an input row with the form used to create the same records, returning the
+    form data and any errors
+    """
+    form = form_class(formdata=_formdata(row, boolean_fields), meta={"csrf": False})
+    if not form.validate():
+        return None, form.errors
+
+    data = form.data
+    try:
+        data["id"] = int(row["id"]) if row.get("id") not in (None, "") else None
+        if form_class is ShowForm:
+            data["artist_id"] = int(data["artist_id"])
+            data["venue_id"] = int(data["venue_id"])
+    except (TypeError, ValueError):
+        return None, {"id": ["Ids must be integers."]}
+
+    return data, None
+
+
+def _copy_value(value):
+    """Format a value for COPY in CSV format, with lists as Postgres arrays"""
+    if isinstance(value, list):
+        items = (
+            '"' + str(item).replace("\\", "\\\\").replace('"', '\\"') + '"'
+            for item in value
+        )
+        return "{" + ",".join(items) + "}"
+    return value
+
+
+def _load_chunk(model, columns, rows):
+    """
+    Load a chunk of validated rows into a staging table with COPY, then upsert them
+    into the model's table. Rows with an id replace the existing record with that id.
+    Returns the line numbers of rows which could not be upserted.
+    """
+    table = model.__table__.name
+    column_list = ", ".join(columns)
+    connection = db.session.connection().connection
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for line, data in rows:
+        writer.writerow([line, data["id"]] + [_copy_value(data[c]) for c in columns])
+    buffer.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE import_{table} ON COMMIT DROP AS "
+            f"SELECT 0 AS line, id, {column_list} FROM {table} WITH NO DATA"
+        )
+        cursor.copy_expert(
+            f"COPY import_{table} (line, id, {column_list}) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+        # Shows referring to an artist or venue which does not exist are rejected
+        valid = "TRUE"
+        if model is Show:
+            valid = (
+                "EXISTS (SELECT FROM artist WHERE artist.id = staged.artist_id) "
+                "AND EXISTS (SELECT FROM venue WHERE venue.id = staged.venue_id)"
+            )
+
+        # Rows with an id are upserted first, and the id sequence moved past them
+        # before the other rows are inserted, so that the ids generated for those cannot
+        # collide with an id in the same chunk. Only the last row with each id is kept,
+        # as a row can only be upserted once
+        if model is Show:
+            # Shows are partitioned by start time, which is part of their primary key,
+            # so there is no constraint on the id alone to upsert on. Shows are replaced
+            # by deleting them first, keeping the time they were listed.
+            cursor.execute("ALTER TABLE import_show ADD COLUMN date_listed timestamptz")
+            cursor.execute(
+                "UPDATE import_show AS staged SET date_listed = show.date_listed "
+                "FROM show WHERE show.id = staged.id"
+            )
+            cursor.execute(
+                f"DELETE FROM show USING import_show AS staged "
+                f"WHERE show.id = staged.id AND {valid}"
+            )
+            cursor.execute(
+                f"INSERT INTO show (id, date_listed, {column_list}) "
+                f"SELECT DISTINCT ON (id) id, coalesce(date_listed, now()), "
+                f"{column_list} FROM import_show AS staged "
+                f"WHERE id IS NOT NULL AND {valid} ORDER BY id, line DESC"
+            )
+        else:
+            updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns)
+            updates += f", updated_at = now(), version = {table}.version + 1"
+            cursor.execute(
+                f"INSERT INTO {table} (id, {column_list}) "
+                f"SELECT DISTINCT ON (id) id, {column_list} "
+                f"FROM import_{table} AS staged "
+                f"WHERE id IS NOT NULL AND {valid} ORDER BY id, line DESC "
+                f"ON CONFLICT (id) DO UPDATE SET {updates}"
+            )
+
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT max(id) FROM {table})) "
+            f"WHERE EXISTS (SELECT FROM import_{table} WHERE id IS NOT NULL)"
+        )
+
+        cursor.execute(
+            f"INSERT INTO {table} ({column_list}) "
+            f"SELECT {column_list} FROM import_{table} AS staged "
+            f"WHERE id IS NULL AND {valid}"
+        )
+
+        cursor.execute(f"SELECT line FROM import_{table} AS staged WHERE NOT ({valid})")
+        invalid = [line for line, in cursor.fetchall()]
+
+    db.session.commit()
+    return invalid
+
+
+def import_file(kind, rows, chunk_size=5000, on_reject=None, on_progress=None):
+    """
+    Import a stream of artist, venue or show rows in chunks, validating each row against
+    the form used to create the same records. on_reject is called with the line number
+    and errors of each rejected row, and on_progress with the stats after each chunk.
+    """
+    model, form_class = IMPORTS[kind]
+    form = form_class(formdata=None, meta={"csrf": False})
+    columns = [field.name for field in form]
+    boolean_fields = {field.name for field in form if isinstance(field, BooleanField)}
+    stats = ImportStats()
+    rows = enumerate(rows, start=1)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        valid = []
+        for line, row in chunk:
+            data, errors = _validate(form_class, boolean_fields, row)
+            if errors:
+                stats.rejected += 1
+                if on_reject:
+                    on_reject(line, errors)
+            else:
+                valid.append((line, data))
+
+        if valid:
+            invalid = _load_chunk(model, columns, valid)
+            stats.imported += len(valid) - len(invalid)
+            stats.rejected += len(invalid)
+            for line in invalid:
+                if on_reject:
+                    on_reject(line, {"show": ["Artist or venue does not exist."]})
+
+        if on_progress:
+            on_progress(stats)
+
+    # Shows are copied in bulk, bypassing the events which maintain show counts
+    if model is Show:
+        refresh_show_counts()
+
+    return stats
+
+
+def _existing_ids(model, ids):
+    """Ids of the given set which belong to an existing artist or venue"""
+    if not ids:
+        return set()
+    return set(db.session.execute(select(model.id).where(model.id.in_(ids))).scalars())
+
+
+def create_batch(kind, rows):
+    """
+    Validate a batch of artist, venue or show rows against the form used to create the
+    same records, and insert the valid rows with a single multi-row INSERT ... RETURNING
+    in one transaction. Returns a result for each row in order, holding either the id
+    of the record created or the errors which rejected it, and the data of the records
+    created.
+    """
+    model, form_class = IMPORTS[kind]
+    form = form_class(formdata=None, meta={"csrf": False})
+    columns = [field.name for field in form]
+    boolean_fields = {field.name for field in form if isinstance(field, BooleanField)}
+
+    results = []
+    valid = []
+    for row in rows:
+        if not isinstance(row, dict):
+            data, errors = None, {"row": ["Rows must be objects."]}
+        elif row.get("id") is not None:
+            data, errors = None, {
+                "id": ["Ids are given to records as they are created."]
+            }
+        else:
+            data, errors = _validate(form_class, boolean_fields, row)
+        results.append({"errors": errors} if errors else {})
+        if not errors:
+            valid.append((results[-1], {column: data[column] for column in columns}))
+
+    # Shows referring to an artist or venue which does not exist are rejected
+    if model is Show:
+        artist_ids = _existing_ids(Artist, {data["artist_id"] for _, data in valid})
+        venue_ids = _existing_ids(Venue, {data["venue_id"] for _, data in valid})
+        for result, data in valid:
+            if data["artist_id"] not in artist_ids or data["venue_id"] not in venue_ids:
+                result["errors"] = {"show": ["Artist or venue does not exist."]}
+        valid = [(result, data) for result, data in valid if not result]
+
+    if valid:
+        # Ids are drawn from the sequence in the order the rows are inserted
+        ids = db.session.execute(
+            insert(model).values([data for _, data in valid]).returning(model.id)
+        ).scalars()
+        for (result, _), record_id in zip(valid, sorted(ids)):
+            result["id"] = record_id
+
+        # Shows are inserted in bulk, bypassing the events which maintain show counts
+        if model is Show:
+            adjust_show_counts([data for _, data in valid], 1)
+
+    db.session.commit()
+    return results, [data for _, data in valid]
@@ -0,0 +1,159 @@
+import re
+import time
+from collections import Counter
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RepeatedStatementError(Exception):
+    """
+    Raised in strict mode when a request executes the same statement shape more times
+    than allowed, which usually indicates an N+1 query pattern
+    """
+
+
+class RequestQueryStats:
+    """
+    Queries executed while handling a single request: how many, how long they took in
+    total and how many times each statement shape was executed
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, limit):
+        """Retrieve the statement shapes executed more than limit times"""
+        return {
+            statement: count
+            for statement, count in self.fingerprints.most_common()
+            if count > limit
+        }
+
+
+def fingerprint(statement):
+    """
+    Reduce a statement to its shape, replacing parameters and literals with placeholders
+    so the same query with different values shares a fingerprint
+    """
+    statement = re.sub(r"%\(\w+\)s|%s|'(?:[^']|'')*'|\b\d+\b", "?", statement)
+    statement = re.sub(r"\(\?(?:,\s*\?)+\)", "(?)", statement)
+    return " ".join(statement.split())
+
+
+class SQLInstrumentation:
+    """
+    Records the queries executed by each request, using SQLAlchemy engine events and
+    Flask request hooks. Reporters are called with the query stats and response at the
+    end of each request, and by default add a Server-Timing header and log the stats.
+    """
+
+    def __init__(self, app=None):
+        self.reporters = [add_server_timing_header, log_query_stats]
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("SQL_INSTRUMENTATION", True)
+        app.config.setdefault("SQL_REPEATED_STATEMENT_LIMIT", 10)
+        app.config.setdefault("SQL_STRICT", False)
+
+        if not app.config["SQL_INSTRUMENTATION"]:
+            return
+
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+        app.before_request(_start_request)
+        app.after_request(self._finish_request)
+
+    def add_reporter(self, reporter):
+        """Register a function to be called with the query stats and response of each request"""
+        self.reporters.append(reporter)
+        return reporter
+
+    def _finish_request(self, response):
+        stats = g.pop("query_stats", None)
+        if stats is not None:
+            for reporter in self.reporters:
+                reporter(stats, response)
+
+        return response
+
+
+def _start_request():
+    g.query_stats = RequestQueryStats()
+
+
+# The start time is kept on the execution context of each statement, rather than on
+# the connection, so that a statement which fails leaves nothing behind to be
+# attributed to the next one
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_time = getattr(context, "query_start_time", None)
+    if start_time is None:
+        return
+    duration = time.perf_counter() - start_time
+
+    stats = g.get("query_stats") if has_app_context() else None
+    if stats is None:
+        return
+
+    stats.record(statement, duration)
+
+    if current_app.config["SQL_STRICT"]:
+        repeated = stats.repeated(current_app.config["SQL_REPEATED_STATEMENT_LIMIT"])
+        if repeated:
+            raise RepeatedStatementError(
+                f"{request.endpoint} repeated a statement {max(repeated.values())} "
+                f"times: {next(iter(repeated))}"
+            )
+
+
+# ===========
+#  Reporters
+# ===========
+
+
+def add_server_timing_header(stats, response):
+    """Report the query count and total database time in a Server-Timing header"""
+    response.headers.add(
+        "Server-Timing",
+        f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"',
+    )
+
+
+def log_query_stats(stats, response):
+    """Log the query stats of each request, warning about repeated statements"""
+    current_app.logger.debug(
+        "%s %s: %d queries in %.2fms",
+        request.method,
+        request.path,
+        stats.count,
+        stats.duration * 1000,
+    )
+
+    limit = current_app.config["SQL_REPEATED_STATEMENT_LIMIT"]
+    for statement, count in stats.repeated(limit).items():
+        current_app.logger.warning(
+            "%s %s repeated a statement %d times, a possible N+1 query: %s",
+            request.method,
+            request.path,
+            count,
+            statement,
+        )
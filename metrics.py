@@ -0,0 +1,245 @@
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, request
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Histogram:
+    """
+    Distribution of observed values, counted in buckets by upper bound for each
+    combination of label values
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Record an observed value for the given label values"""
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Counts per bucket, with an extra bucket for values above the largest
+                # bound, followed by the sum of the observed values
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def collect(self):
+        """Render the histogram in the Prometheus text exposition format"""
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+
+        with self._lock:
+            all_series = [(key, list(series)) for key, series in self._series.items()]
+
+        for key, series in all_series:
+            labels = dict(zip(self.labelnames, key))
+            count = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), series):
+                count += bucket_count
+                bucket_labels = _format_labels({**labels, "le": bound})
+                yield f"{self.name}_bucket{bucket_labels} {count}"
+            yield f"{self.name}_sum{_format_labels(labels)} {series[-1]}"
+            yield f"{self.name}_count{_format_labels(labels)} {count}"
+
+
+class Gauge:
+    """Value measured when the metrics are collected, by calling a function"""
+
+    def __init__(self, name, documentation, function):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+
+    def collect(self):
+        """Render the gauge in the Prometheus text exposition format"""
+        value = self.function()
+        if value is None:
+            return
+
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {value}"
+
+
+class Counter(Gauge):
+    """Total which only increases, measured when the metrics are collected"""
+
+    def collect(self):
+        """Render the counter in the Prometheus text exposition format"""
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        yield f"{self.name} {self.function()}"
+
+
+class MetricsRegistry:
+    """Collection of metrics exposed together"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, function):
+        return self.register(Gauge(name, documentation, function))
+
+    def counter(self, name, documentation, function):
+        return self.register(Counter(name, documentation, function))
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def exposition(self):
+        """Render every metric in the Prometheus text exposition format"""
+        lines = [line for metric in self.metrics for line in metric.collect()]
+        return "\n".join(lines) + "\n"
+
+
+class Metrics:
+    """
+    Collects request, database, connection pool and template metrics for the
+    application, exposed at /metrics in the Prometheus text exposition format
+    """
+
+    def __init__(self, app=None, db=None, instrumentation=None):
+        self.registry = MetricsRegistry()
+        self.request_duration = self.registry.histogram(
+            "fyyur_request_duration_seconds",
+            "Time taken to handle a request.",
+            ("endpoint", "method", "status"),
+        )
+        self.db_duration = self.registry.histogram(
+            "fyyur_request_db_duration_seconds",
+            "Time spent executing queries while handling a request.",
+            ("endpoint",),
+        )
+        self.template_duration = self.registry.histogram(
+            "fyyur_template_render_duration_seconds",
+            "Time taken to render a template.",
+            ("template",),
+        )
+        if app is not None:
+            self.init_app(app, db, instrumentation)
+
+    def init_app(self, app, db, instrumentation=None):
+        app.config.setdefault("METRICS_ENABLED", True)
+        if not app.config["METRICS_ENABLED"]:
+            return
+
+        self._register_pool_gauges(app, db)
+
+        app.before_request(_start_timer)
+        app.after_request(self._observe_request)
+        if instrumentation is not None:
+            instrumentation.add_reporter(self._observe_db_time)
+
+        # Time template rendering by wrapping the template class used by Jinja
+        template_duration = self.template_duration
+
+        class TimedTemplate(app.jinja_env.template_class):
+            def render(self, *args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return super().render(*args, **kwargs)
+                finally:
+                    template_duration.observe(
+                        time.perf_counter() - start, template=self.name
+                    )
+
+        app.jinja_env.template_class = TimedTemplate
+
+        app.add_url_rule("/metrics", "metrics", self._metrics_view)
+
+    def _register_pool_gauges(self, app, db):
+        def pool_stat(name):
+            def measure():
+                with app.app_context():
+                    pool = db.get_engine().pool
+                stat = getattr(pool, name, None)
+                return stat() if stat is not None else None
+
+            return measure
+
+        self.registry.gauge(
+            "fyyur_db_pool_size",
+            "Number of connections the database pool keeps open.",
+            pool_stat("size"),
+        )
+        self.registry.gauge(
+            "fyyur_db_pool_checked_out",
+            "Number of database connections currently in use.",
+            pool_stat("checkedout"),
+        )
+        overflow = pool_stat("overflow")
+
+        def measure_overflow():
+            # The pool reports a negative overflow while fewer connections than the
+            # pool size are open
+            value = overflow()
+            return None if value is None else max(value, 0)
+
+        self.registry.gauge(
+            "fyyur_db_pool_overflow",
+            "Number of database connections open beyond the pool size.",
+            measure_overflow,
+        )
+
+    def _observe_request(self, response):
+        start = g.pop("request_start_time", None)
+        if start is not None:
+            self.request_duration.observe(
+                time.perf_counter() - start,
+                endpoint=request.endpoint or "none",
+                method=request.method,
+                status=response.status_code,
+            )
+
+        return response
+
+    def _observe_db_time(self, stats, response):
+        self.db_duration.observe(stats.duration, endpoint=request.endpoint or "none")
+
+    def _metrics_view(self):
+        return Response(
+            self.registry.exposition(), mimetype="text/plain; version=0.0.4"
+        )
+
+
+def _start_timer():
+    g.request_start_time = time.perf_counter()
+
+
+def benchmark_overhead(iterations=100000):
+    """
+    Measure the average time taken to observe a value in a histogram, returning it in
+    seconds
+    """
+    histogram = Histogram("benchmark", "Benchmark histogram.", ("endpoint", "status"))
+    start = time.perf_counter()
+    for i in range(iterations):
+        histogram.observe(i / iterations, endpoint="shows", status=200)
+    return (time.perf_counter() - start) / iterations
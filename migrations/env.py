@@ -1,6 +1,7 @@
 from __future__ import with_statement
 
 import logging
+import re
 from logging.config import fileConfig
 
 from flask import current_app
@@ -26,6 +27,15 @@ config.set_main_option(
 )
 target_metadata = current_app.extensions["migrate"].db.metadata
 
+# Partitions of the show table, and partitions detached from it, are managed by the
+# `flask partitions` command rather than by migrations
+PARTITION_TABLE = re.compile(r"(archived_)?show_(\d{4}_\d{2}|default)")
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (type_ == "table" and PARTITION_TABLE.fullmatch(name))
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -76,6 +86,7 @@ def run_migrations_online():
             connection=connection,
             target_metadata=target_metadata,
             process_revision_directives=process_revision_directives,
+            include_object=include_object,
             **current_app.extensions["migrate"].configure_args
         )
 
@@ -0,0 +1,131 @@
+"""partition shows by month of start time
+
+Revision ID: be0320fd5794
+Revises: 7eee75794a17
+Create Date: 2026-10-18 04:46:42.841178
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "be0320fd5794"
+down_revision = "7eee75794a17"
+branch_labels = None
+depends_on = None
+
+# Columns copied between the old and new show tables, as the time range is generated
+COLUMNS = "id, start_time, artist_id, venue_id, duration, date_listed, updated_at"
+
+# Create a partition for each month from the earliest show up to a year ahead, and a
+# default partition for shows outside them. Later partitions are created by the
+# `flask partitions` command.
+CREATE_PARTITIONS = """
+DO $$
+DECLARE
+    partition_start timestamp := date_trunc(
+        'month', least((SELECT min(start_time) FROM show_old), now())
+    );
+BEGIN
+    WHILE partition_start <= date_trunc('month', now()) + interval '12 months' LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF show FOR VALUES FROM (%L) TO (%L)',
+            'show_' || to_char(partition_start, 'YYYY_MM'),
+            partition_start,
+            partition_start + interval '1 month'
+        );
+        partition_start := partition_start + interval '1 month';
+    END LOOP;
+END
+$$
+"""
+
+
+def _create_show_table(**kwargs):
+    op.create_table(
+        "show",
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('show_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("artist_id", sa.Integer(), nullable=False),
+        sa.Column("venue_id", sa.Integer(), nullable=False),
+        sa.Column("duration", sa.Integer(), server_default="180", nullable=False),
+        sa.Column(
+            "during",
+            postgresql.TSRANGE(),
+            sa.Computed(
+                "tsrange(start_time, start_time + duration * interval '1 minute')"
+            ),
+            nullable=True,
+        ),
+        sa.Column(
+            "date_listed",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        **kwargs,
+    )
+
+
+def _replace_show_table(primary_key, **kwargs):
+    """
+    Replace the show table with a new one, copying its shows. The constraints and
+    indexes are created once the old table is dropped, so they keep their names.
+    """
+    op.rename_table("show", "show_old")
+    op.execute("ALTER SEQUENCE show_id_seq OWNED BY NONE")
+
+    _create_show_table(**kwargs)
+    if "postgresql_partition_by" in kwargs:
+        op.execute(CREATE_PARTITIONS)
+        op.execute("CREATE TABLE show_default PARTITION OF show DEFAULT")
+    op.execute(f"INSERT INTO show ({COLUMNS}) SELECT {COLUMNS} FROM show_old")
+
+    op.drop_table("show_old")
+    op.execute("ALTER SEQUENCE show_id_seq OWNED BY show.id")
+
+    op.create_primary_key("show_pkey", "show", primary_key)
+    op.create_foreign_key(
+        "show_artist_id_fkey",
+        "show",
+        "artist",
+        ["artist_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+    op.create_foreign_key(
+        "show_venue_id_fkey", "show", "venue", ["venue_id"], ["id"], ondelete="CASCADE"
+    )
+    op.create_index("ix_show_venue_id_start_time", "show", ["venue_id", "start_time"])
+    op.create_index("ix_show_during", "show", ["during"], postgresql_using="gist")
+    op.create_index("ix_show_artist_id_start_time", "show", ["artist_id", "start_time"])
+    op.create_index("ix_show_start_time_id", "show", ["start_time", "id"])
+    op.create_index("ix_show_date_listed", "show", ["date_listed"])
+    op.create_index("ix_show_updated_at", "show", ["updated_at"])
+
+
+def upgrade():
+    _replace_show_table(
+        ["id", "start_time"],
+        postgresql_partition_by="RANGE (start_time)",
+    )
+    op.create_check_constraint(
+        "ck_show_duration", "show", "duration BETWEEN 1 AND 1440"
+    )
+
+
+def downgrade():
+    # Partitions detached by `flask partitions` are left in place
+    _replace_show_table(["id"])
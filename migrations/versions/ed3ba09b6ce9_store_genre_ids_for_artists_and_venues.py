@@ -0,0 +1,116 @@
+"""store genre ids for artists and venues
+
+Revision ID: ed3ba09b6ce9
+Revises: cc080395273c
+Create Date: 2026-10-18 04:36:27.167047
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "ed3ba09b6ce9"
+down_revision = "cc080395273c"
+branch_labels = None
+depends_on = None
+
+# Genres offered by the artist and venue forms
+GENRES = [
+    "Alternative",
+    "Blues",
+    "Classical",
+    "Country",
+    "Electronic",
+    "Folk",
+    "Funk",
+    "Hip-Hop",
+    "Heavy Metal",
+    "Instrumental",
+    "Jazz",
+    "Metal",
+    "Musical Theatre",
+    "Pop",
+    "Punk",
+    "R&B",
+    "Reggae",
+    "Rock n Roll",
+    "Soul",
+    "Other",
+]
+
+# Look up the ids of the genre names of an artist or venue as it is written, adding any
+# genres which do not exist yet. Only missing genres are inserted, so that conflicting
+# inserts do not use up values of the genre id sequence.
+SET_GENRE_IDS = """
+CREATE FUNCTION set_genre_ids() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO genre (name)
+    SELECT DISTINCT new_genre.name
+    FROM unnest(NEW.genres) AS new_genre (name)
+    WHERE new_genre.name IS NOT NULL
+        AND NOT EXISTS (SELECT FROM genre WHERE genre.name = new_genre.name)
+    ON CONFLICT (name) DO NOTHING;
+
+    NEW.genre_ids := ARRAY(
+        SELECT id FROM genre WHERE name = ANY (NEW.genres) ORDER BY id
+    );
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade():
+    genre = op.create_table(
+        "genre",
+        sa.Column("id", sa.SmallInteger(), nullable=False),
+        sa.Column("name", sa.String(length=120), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name"),
+    )
+    op.bulk_insert(genre, [{"name": name} for name in GENRES])
+
+    op.execute(SET_GENRE_IDS)
+    for table in ("artist", "venue"):
+        op.add_column(
+            table,
+            sa.Column(
+                "genre_ids",
+                postgresql.ARRAY(sa.SmallInteger()),
+                server_default="{}",
+                nullable=False,
+            ),
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_genre_ids BEFORE INSERT OR UPDATE OF genres "
+            f"ON {table} FOR EACH ROW EXECUTE FUNCTION set_genre_ids()"
+        )
+        # Fire the trigger for existing rows
+        op.execute(f"UPDATE {table} SET genres = genres")
+
+        op.drop_index(f"ix_{table}_genres", table_name=table)
+        op.create_index(
+            f"ix_{table}_genre_ids",
+            table,
+            ["genre_ids"],
+            unique=False,
+            postgresql_using="gin",
+        )
+
+
+def downgrade():
+    for table in ("venue", "artist"):
+        op.drop_index(f"ix_{table}_genre_ids", table_name=table)
+        op.create_index(
+            f"ix_{table}_genres",
+            table,
+            ["genres"],
+            unique=False,
+            postgresql_using="gin",
+        )
+        op.execute(f"DROP TRIGGER {table}_genre_ids ON {table}")
+        op.drop_column(table, "genre_ids")
+
+    op.execute("DROP FUNCTION set_genre_ids()")
+    op.drop_table("genre")
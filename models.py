@@ -1,14 +1,59 @@
+import heapq
+import re
 import sqlite3
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import islice
+
+import dateutil.parser
+from dateutil.rrule import rrule, rrulestr
+from flask import current_app
+from psycopg2.extras import DateTimeRange
+from sqlalchemy import (
+    bindparam,
+    column,
+    delete,
+    event,
+    false,
+    or_,
+    select,
+    true,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, TSRANGE
+from sqlalchemy.orm import selectinload, validates
 from sqlalchemy.sql import func
-from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from replicas import RoutingSQLAlchemy
+
+db = RoutingSQLAlchemy()
+
+
+class Genre(db.Model):
+    """
+    Genre of artists and venues. Genres are added as they are first given to an artist
+    or venue, by the trigger which maintains their genre ids.
+    """
+
+    id = db.Column(db.SmallInteger, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f"Genre(name={self.name})"
 
 
 class Artist(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
     genres = db.Column(db.ARRAY(db.String(120)))
+    # Ids of the genres, kept up to date with the genre names by a database trigger
+    genre_ids = db.Column(
+        ARRAY(db.SmallInteger),
+        nullable=False,
+        server_default="{}",
+        server_onupdate=db.FetchedValue(),
+    )
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
@@ -17,8 +62,44 @@ class Artist(db.Model):
     image_link = db.Column(db.String(500))
     seeking_venue = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(500))
-    shows = db.relationship("Show", backref="artist", lazy=True)
+    shows = db.relationship(
+        "Show",
+        backref="artist",
+        lazy=True,
+        cascade="all, delete",
+        passive_deletes=True,
+    )
     date_listed = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(
+        db.DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+    # Incremented by each edit, so that concurrent edits are detected
+    version = db.Column(db.Integer, nullable=False, server_default="1")
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+
+    __table_args__ = (
+        db.Index("ix_artist_date_listed", "date_listed"),
+        db.Index("ix_artist_updated_at", "updated_at"),
+        db.Index("ix_artist_genre_ids", "genre_ids", postgresql_using="gin"),
+        db.Index("ix_artist_name_id", "name", "id"),
+        db.Index("ix_artist_city_state_name_id", "city", "state", "name", "id"),
+        db.Index(
+            "ix_artist_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
+
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return f"Artist(name={self.name})"
@@ -33,23 +114,750 @@ class Venue(db.Model):
     phone = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     genres = db.Column(db.ARRAY(db.String(250)))
+    # Ids of the genres, kept up to date with the genre names by a database trigger
+    genre_ids = db.Column(
+        ARRAY(db.SmallInteger),
+        nullable=False,
+        server_default="{}",
+        server_onupdate=db.FetchedValue(),
+    )
     facebook_link = db.Column(db.String(120))
     website_link = db.Column(db.String(500))
     seeking_talent = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(500))
-    shows = db.relationship("Show", backref="venue", lazy=True)
+    shows = db.relationship(
+        "Show",
+        backref="venue",
+        lazy=True,
+        cascade="all, delete",
+        passive_deletes=True,
+    )
     date_listed = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(
+        db.DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+    # Incremented by each edit, so that concurrent edits are detected
+    version = db.Column(db.Integer, nullable=False, server_default="1")
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+
+    __table_args__ = (
+        db.Index("ix_venue_date_listed", "date_listed"),
+        db.Index("ix_venue_updated_at", "updated_at"),
+        db.Index("ix_venue_city_state", "city", "state"),
+        db.Index("ix_venue_genre_ids", "genre_ids", postgresql_using="gin"),
+        db.Index(
+            "ix_venue_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
+
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return f"Venue(name={self.name})"
 
 
+# Length of a show in minutes, unless given, and the longest a show may be
+SHOW_DURATION = 180
+MAX_SHOW_DURATION = 24 * 60
+
+
 class Show(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    start_time = db.Column(db.DateTime)
-    artist_id = db.Column(db.Integer, db.ForeignKey("artist.id"), nullable=False)
-    venue_id = db.Column(db.Integer, db.ForeignKey("venue.id"), nullable=False)
+    # Shows are partitioned by month of start time, so the start time is part of the
+    # primary key of the table, although a show is identified by its id alone
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    start_time = db.Column(db.DateTime, primary_key=True)
+    artist_id = db.Column(
+        db.Integer, db.ForeignKey("artist.id", ondelete="CASCADE"), nullable=False
+    )
+    venue_id = db.Column(
+        db.Integer, db.ForeignKey("venue.id", ondelete="CASCADE"), nullable=False
+    )
+    # Length of the show in minutes
+    duration = db.Column(
+        db.Integer,
+        nullable=False,
+        default=SHOW_DURATION,
+        server_default=str(SHOW_DURATION),
+    )
+    # Time range the show occupies its venue for, generated from its start time and
+    # duration
+    during = db.Column(
+        TSRANGE,
+        db.Computed("tsrange(start_time, start_time + duration * interval '1 minute')"),
+    )
     date_listed = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(
+        db.DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+    __table_args__ = (
+        db.Index("ix_show_venue_id_start_time", "venue_id", "start_time"),
+        db.Index("ix_show_during", "during", postgresql_using="gist"),
+        db.Index("ix_show_artist_id_start_time", "artist_id", "start_time"),
+        db.Index("ix_show_start_time_id", "start_time", "id"),
+        db.Index("ix_show_date_listed", "date_listed"),
+        db.Index("ix_show_updated_at", "updated_at"),
+        db.CheckConstraint(
+            f"duration BETWEEN 1 AND {MAX_SHOW_DURATION}", name="ck_show_duration"
+        ),
+        {"postgresql_partition_by": "RANGE (start_time)"},
+    )
+    __mapper_args__ = {"primary_key": [id]}
+
+    @validates("start_time")
+    def validate_start_time(self, key, start_time):
+        # Shows created from form data provide the start time as a string
+        if isinstance(start_time, str):
+            start_time = dateutil.parser.parse(start_time)
+        return start_time
+
+    @validates("duration")
+    def validate_duration(self, key, duration):
+        # Shows created from form data provide the duration as a string, which is
+        # empty if the field was cleared
+        if isinstance(duration, str):
+            duration = int(duration) if duration.strip() else SHOW_DURATION
+        return duration
 
     def __repr__(self):
         return f"Show(artist_id={self.artist_id}, venue_id={self.venue_id}, start_time={self.start_time})"
+
+
+# Recurrences may repeat daily at most often, and the occurrences of a series with more
+# than SERIES_MAX_OCCURRENCES are treated as repeating forever when it is looked up
+RECURRENCE_FREQUENCY = re.compile(r"(^|;)FREQ=(YEARLY|MONTHLY|WEEKLY|DAILY)(;|$)")
+SERIES_MAX_OCCURRENCES = 1000
+
+
+class ShowSeries(db.Model):
+    """
+    Show repeated on an RRULE-style recurrence, such as a weekly residency, stored as a
+    single row however many times it repeats. Occurrences are expanded lazily when they
+    are listed, and changes to single occurrences are stored sparsely as exceptions.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    artist_id = db.Column(
+        db.Integer, db.ForeignKey("artist.id", ondelete="CASCADE"), nullable=False
+    )
+    venue_id = db.Column(
+        db.Integer, db.ForeignKey("venue.id", ondelete="CASCADE"), nullable=False
+    )
+    # Start time of the first occurrence, which the recurrence repeats from
+    start_time = db.Column(db.DateTime, nullable=False)
+    # Length of each occurrence in minutes
+    duration = db.Column(
+        db.Integer,
+        nullable=False,
+        default=SHOW_DURATION,
+        server_default=str(SHOW_DURATION),
+    )
+    # Recurrence rule in the RRULE format of RFC 5545, e.g. FREQ=WEEKLY;COUNT=104
+    recurrence = db.Column(db.String(500), nullable=False)
+    # Range of start times of the occurrences, unbounded above if the series repeats
+    # forever, so that the series overlapping a window can be found with an index
+    period = db.Column(TSRANGE, nullable=False)
+    exceptions = db.relationship(
+        "ShowSeriesException",
+        backref="series",
+        lazy=True,
+        cascade="all, delete",
+        passive_deletes=True,
+    )
+    date_listed = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(
+        db.DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+    __table_args__ = (
+        db.Index("ix_show_series_venue_id", "venue_id"),
+        db.Index("ix_show_series_artist_id", "artist_id"),
+        db.Index("ix_show_series_period", "period", postgresql_using="gist"),
+        db.Index("ix_show_series_updated_at", "updated_at"),
+        db.CheckConstraint(
+            f"duration BETWEEN 1 AND {MAX_SHOW_DURATION}",
+            name="ck_show_series_duration",
+        ),
+    )
+
+    @validates("start_time")
+    def validate_start_time(self, key, start_time):
+        # Series created from form data provide the start time as a string
+        if isinstance(start_time, str):
+            start_time = dateutil.parser.parse(start_time)
+        return start_time
+
+    @validates("duration")
+    def validate_duration(self, key, duration):
+        if isinstance(duration, str):
+            duration = int(duration) if duration.strip() else SHOW_DURATION
+        return duration
+
+    @validates("recurrence")
+    def validate_recurrence(self, key, recurrence):
+        recurrence = recurrence.strip().upper()
+        if recurrence.startswith("RRULE:"):
+            recurrence = recurrence[len("RRULE:") :]
+        if not RECURRENCE_FREQUENCY.search(recurrence):
+            raise ValueError("Shows may repeat daily, weekly, monthly or yearly")
+        if not isinstance(rrulestr(recurrence, dtstart=datetime.now()), rrule):
+            raise ValueError("Recurrences must be a single RRULE")
+        return recurrence
+
+    @property
+    def rule(self):
+        return rrulestr(self.recurrence, dtstart=self.start_time)
+
+    def update_period(self):
+        """
+        Set the range of start times of the occurrences, after the series or one of its
+        exceptions changes
+        """
+        starts = list(islice(self.rule, SERIES_MAX_OCCURRENCES + 1))
+        starts += [e.start_time for e in self.exceptions if e.start_time is not None]
+        first = min(starts, default=self.start_time)
+        last = max(starts, default=self.start_time)
+        if len(starts) > SERIES_MAX_OCCURRENCES:
+            last = None
+        self.period = DateTimeRange(min(first, self.start_time), last, "[]")
+
+    def horizon(self, days_ahead, now=None):
+        """
+        End of the window the occurrences of the series are listed and counted in: a
+        number of days after now, or after its first occurrence if that is later
+        """
+        return max(now or datetime.now(), self.start_time) + timedelta(days=days_ahead)
+
+    def show_counts(self, days_ahead, now=None):
+        """
+        Number of upcoming occurrences up to the horizon given by days_ahead, and the
+        number of past occurrences
+        """
+        now = now or datetime.now()
+        upcoming = past = 0
+        for start_time, _, _ in self.occurrences(end=self.horizon(days_ahead, now)):
+            if start_time >= now:
+                upcoming += 1
+            else:
+                past += 1
+        return upcoming, past
+
+    def occurrences(self, start=None, end=None):
+        """
+        Lazily generate the start time, duration and original start time of each
+        occurrence starting within a window of start times, where end is exclusive, in
+        order. Cancelled occurrences are skipped, and rescheduled occurrences are moved.
+        """
+        exceptions = {exception.occurrence: exception for exception in self.exceptions}
+
+        def in_window(start_time):
+            return (start is None or start_time >= start) and (
+                end is None or start_time < end
+            )
+
+        def scheduled():
+            for occurrence in self.rule:
+                if end is not None and occurrence >= end:
+                    return
+                if start is not None and occurrence < start:
+                    continue
+
+                exception = exceptions.get(occurrence)
+                if exception is None:
+                    yield occurrence, self.duration, occurrence
+                elif not exception.cancelled and exception.start_time is None:
+                    yield occurrence, exception.duration or self.duration, occurrence
+
+        rescheduled = sorted(
+            (exception.start_time, exception.duration or self.duration, occurrence)
+            for occurrence, exception in exceptions.items()
+            if not exception.cancelled
+            and exception.start_time is not None
+            and in_window(exception.start_time)
+        )
+        return heapq.merge(scheduled(), rescheduled)
+
+    def __repr__(self):
+        return f"ShowSeries(artist_id={self.artist_id}, venue_id={self.venue_id}, recurrence={self.recurrence})"
+
+
+class ShowSeriesException(db.Model):
+    """
+    Change to a single occurrence of a show series, which is either cancelled or moved
+    to another start time or duration. Only occurrences which differ from the series
+    are stored.
+    """
+
+    series_id = db.Column(
+        db.Integer,
+        db.ForeignKey("show_series.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    # Start time of the occurrence given by the recurrence of the series
+    occurrence = db.Column(db.DateTime, primary_key=True)
+    cancelled = db.Column(
+        db.Boolean, nullable=False, default=False, server_default=false()
+    )
+    # Start time and duration the occurrence was moved to, if it was rescheduled
+    start_time = db.Column(db.DateTime)
+    duration = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.CheckConstraint(
+            f"duration BETWEEN 1 AND {MAX_SHOW_DURATION}",
+            name="ck_show_series_exception_duration",
+        ),
+    )
+
+    def __repr__(self):
+        return f"ShowSeriesException(series_id={self.series_id}, occurrence={self.occurrence})"
+
+
+def series_in_window(condition, start=None, end=None):
+    """
+    Retrieve the show series matching a condition with an occurrence starting within a
+    window of start times, along with their exceptions, and the names and image links
+    of their artists and venues
+    """
+    return (
+        db.session.query(
+            ShowSeries,
+            Venue.name.label("venue_name"),
+            Venue.image_link.label("venue_image_link"),
+            Artist.name.label("artist_name"),
+            Artist.image_link.label("artist_image_link"),
+        )
+        .join(Venue, Venue.id == ShowSeries.venue_id)
+        .join(Artist, Artist.id == ShowSeries.artist_id)
+        .options(selectinload(ShowSeries.exceptions))
+        .filter(condition, ShowSeries.period.overlaps(func.tsrange(start, end)))
+        .all()
+    )
+
+
+# =====================
+#  Show count tracking
+# =====================
+
+
+def _adjust_show_counts(connection, show, delta):
+    """
+    Adjust the upcoming or past show count of the venue and artist for a show by delta
+    """
+    if show.start_time >= datetime.now():
+        column = "upcoming_shows_count"
+    else:
+        column = "past_shows_count"
+
+    for table, entity_id in (
+        (Venue.__table__, show.venue_id),
+        (Artist.__table__, show.artist_id),
+    ):
+        connection.execute(
+            table.update()
+            .where(table.c.id == entity_id)
+            .values({column: table.c[column] + delta})
+        )
+
+
+@event.listens_for(Show, "after_insert")
+def _increment_show_counts(mapper, connection, show):
+    _adjust_show_counts(connection, show, 1)
+
+
+@event.listens_for(Show, "after_delete")
+def _decrement_show_counts(mapper, connection, show):
+    _adjust_show_counts(connection, show, -1)
+
+
+def _adjust_series_counts(connection, series, delta):
+    """
+    Adjust the upcoming and past show counts of the venue and artist for the counted
+    occurrences of a show series by delta each
+    """
+    upcoming, past = series.show_counts(current_app.config["SHOW_SERIES_DAYS_AHEAD"])
+    if not upcoming and not past:
+        return
+
+    for table, entity_id in (
+        (Venue.__table__, series.venue_id),
+        (Artist.__table__, series.artist_id),
+    ):
+        connection.execute(
+            table.update()
+            .where(table.c.id == entity_id)
+            .values(
+                upcoming_shows_count=table.c.upcoming_shows_count + upcoming * delta,
+                past_shows_count=table.c.past_shows_count + past * delta,
+            )
+        )
+
+
+@event.listens_for(ShowSeries, "after_insert")
+def _increment_series_counts(mapper, connection, series):
+    _adjust_series_counts(connection, series, 1)
+
+
+@event.listens_for(ShowSeries, "after_delete")
+def _decrement_series_counts(mapper, connection, series):
+    _adjust_series_counts(connection, series, -1)
+
+
+def adjust_series_counts(series, delta):
+    """
+    Adjust the show counts of the venue and artist of a show series for its occurrences
+    by delta each, around a change to its exceptions: by -1 before it and 1 after it
+    """
+    _adjust_series_counts(db.session.connection(), series, delta)
+
+
+def _add_to_show_counts(model, counts, sign):
+    """
+    Add counts of shows, keyed by the id of a venue or artist and "upcoming" or "past",
+    multiplied by sign to their show counts, with an executemany UPDATE for each
+    """
+    table = model.__table__
+    for kind in ("upcoming", "past"):
+        count_column = f"{kind}_shows_count"
+        params = [
+            {"entity_id": entity_id, "delta": count * sign}
+            for (entity_id, counted), count in sorted(counts.items())
+            if counted == kind and count
+        ]
+        if params:
+            db.session.execute(
+                table.update()
+                .where(table.c.id == bindparam("entity_id"))
+                .values({count_column: table.c[count_column] + bindparam("delta")}),
+                params,
+            )
+
+
+def _series_show_counts(condition, now):
+    """
+    Count the upcoming and past occurrences of the show series matching a condition,
+    for each of their venues and artists
+    """
+    days_ahead = current_app.config["SHOW_SERIES_DAYS_AHEAD"]
+    counts = {Venue: Counter(), Artist: Counter()}
+    series = ShowSeries.query.options(selectinload(ShowSeries.exceptions)).filter(
+        condition
+    )
+    for row in series:
+        upcoming, past = row.show_counts(days_ahead, now)
+        for model, entity_id in ((Venue, row.venue_id), (Artist, row.artist_id)):
+            counts[model][entity_id, "upcoming"] += upcoming
+            counts[model][entity_id, "past"] += past
+    return counts
+
+
+def adjust_show_counts(shows, delta):
+    """
+    Adjust the upcoming or past show counts of the venues and artists of a batch of
+    shows, given as dicts, which were inserted or deleted in bulk. Each count is
+    adjusted by a single executemany UPDATE, in order of id.
+    """
+    now = datetime.now()
+    for model, key in ((Venue, "venue_id"), (Artist, "artist_id")):
+        table = model.__table__
+        for column, upcoming in (
+            ("upcoming_shows_count", True),
+            ("past_shows_count", False),
+        ):
+            deltas = Counter(
+                show[key] for show in shows if (show["start_time"] >= now) == upcoming
+            )
+            if not deltas:
+                continue
+
+            db.session.execute(
+                table.update()
+                .where(table.c.id == bindparam("entity_id"))
+                .values({column: table.c[column] + bindparam("delta")}),
+                [
+                    {"entity_id": entity_id, "delta": count * delta}
+                    for entity_id, count in sorted(deltas.items())
+                ],
+            )
+
+
+def refresh_show_counts():
+    """
+    Recalculate the upcoming and past show counts for every venue and artist, including
+    the occurrences of show series, moving shows which have started since the last
+    refresh from upcoming to past. Only rows
+    whose counts have changed are updated, so their updated_at time is left alone.
+    """
+    now = datetime.now()
+    series_counts = _series_show_counts(true(), now)
+    for model, foreign_key in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+        shows = select(func.count(Show.id)).where(foreign_key == model.id)
+        upcoming = shows.where(Show.start_time >= now).scalar_subquery()
+        past = shows.where(Show.start_time < now).scalar_subquery()
+
+        # The occurrences of show series are counted in Python, and joined in as a list
+        # of values for each venue or artist with any
+        entity_ids = sorted({entity_id for entity_id, _ in series_counts[model]})
+        if entity_ids:
+            occurrences = values(
+                column("id", db.Integer),
+                column("upcoming", db.Integer),
+                column("past", db.Integer),
+                name="occurrences",
+            ).data(
+                [
+                    (
+                        entity_id,
+                        series_counts[model][entity_id, "upcoming"],
+                        series_counts[model][entity_id, "past"],
+                    )
+                    for entity_id in entity_ids
+                ]
+            )
+            upcoming = upcoming + func.coalesce(
+                select(occurrences.c.upcoming)
+                .where(occurrences.c.id == model.id)
+                .scalar_subquery(),
+                0,
+            )
+            past = past + func.coalesce(
+                select(occurrences.c.past)
+                .where(occurrences.c.id == model.id)
+                .scalar_subquery(),
+                0,
+            )
+        db.session.execute(
+            model.__table__.update()
+            .where(
+                or_(
+                    model.upcoming_shows_count != upcoming,
+                    model.past_shows_count != past,
+                )
+            )
+            .values(upcoming_shows_count=upcoming, past_shows_count=past)
+        )
+    db.session.commit()
+
+
+# ==================
+#  Cascading deletes
+# ==================
+
+
+def _delete_with_shows(model, foreign_key, other_model, other_foreign_key, entity_id):
+    """
+    Delete a venue or artist in a single statement, letting the database cascade the
+    delete to its shows and show series. The show counts of the other side of each show
+    are adjusted in the same statement, and those for each series occurrence before it.
+    Returns the name of the deleted entity and its number of shows and series
+    occurrences, or None if it does not exist.
+    """
+    now = datetime.now()
+    removed = (
+        select(
+            other_foreign_key.label("other_id"),
+            func.count().filter(Show.start_time >= now).label("upcoming"),
+            func.count().filter(Show.start_time < now).label("past"),
+        )
+        .where(foreign_key == entity_id)
+        .group_by(other_foreign_key)
+        .cte("removed")
+    )
+    adjusted = (
+        update(other_model)
+        .where(other_model.id == removed.c.other_id)
+        .values(
+            upcoming_shows_count=other_model.upcoming_shows_count - removed.c.upcoming,
+            past_shows_count=other_model.past_shows_count - removed.c.past,
+        )
+        .cte("adjusted")
+    )
+    show_count = select(
+        func.coalesce(func.sum(removed.c.upcoming + removed.c.past), 0)
+    ).scalar_subquery()
+
+    # The show series are deleted along with their occurrences, which are counted by
+    # the venues or artists on the other side too
+    series_counts = _series_show_counts(
+        getattr(ShowSeries, foreign_key.key) == entity_id, now
+    )[other_model]
+    _add_to_show_counts(other_model, series_counts, -1)
+
+    deleted = db.session.execute(
+        delete(model)
+        .where(model.id == entity_id)
+        .returning(model.name, show_count)
+        .add_cte(adjusted)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if deleted is None:
+        return None
+
+    name, show_count = deleted
+    return name, show_count + sum(series_counts.values())
+
+
+def delete_venue_and_shows(venue_id):
+    """Delete a venue and all of its shows, returning its name and number of shows"""
+    return _delete_with_shows(Venue, Show.venue_id, Artist, Show.artist_id, venue_id)
+
+
+def delete_artist_and_shows(artist_id):
+    """Delete an artist and all of their shows, returning their name and number of shows"""
+    return _delete_with_shows(Artist, Show.artist_id, Venue, Show.venue_id, artist_id)
+
+
+# ====================
+#  Optimistic updates
+# ====================
+
+
+def update_if_current(model, entity_id, version, values):
+    """
+    Update the columns of a venue or artist whose values have changed, but only if it
+    is still at the version it was edited from. Unchanged columns are left out of the
+    update, so they are never overwritten and triggers on them do not fire. Returns
+    whether it was changed by someone else in the meantime, and whether it was updated,
+    or None if it does not exist.
+    """
+    columns = [getattr(model, name) for name in values]
+    current = db.session.execute(
+        select(model.version, *columns).where(model.id == entity_id)
+    ).first()
+    if current is None:
+        return None
+    if current.version != version:
+        return True, False
+
+    changed = {
+        name: value for name, value in values.items() if getattr(current, name) != value
+    }
+    if not changed:
+        return False, False
+
+    updated = db.session.execute(
+        update(model)
+        .where(model.id == entity_id, model.version == version)
+        .values(**changed, version=model.version + 1)
+        .returning(model.version)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+    # The update skips a row which a concurrent edit changed after it was read, or
+    # which was deleted in the meantime
+    return updated is None, updated is not None
+
+
+# ===============
+#  Page versions
+# ===============
+
+
+def _detail_version(model, foreign_key, other_model, other_foreign_key, entity_id):
+    """
+    Retrieve the version of a venue or artist page: when the venue or artist, their
+    shows and show series or the artists or venues of those were last modified, how
+    many shows and series they have, so that deletions are noticed, and how many of
+    their shows and series occurrences have started, as they move from upcoming to past
+    over time. Returns None if the venue or artist does not exist.
+    """
+    now = datetime.now()
+    series_foreign_key = getattr(ShowSeries, foreign_key.key)
+    series_other_foreign_key = getattr(ShowSeries, other_foreign_key.key)
+    version = (
+        db.session.query(
+            func.greatest(
+                func.max(model.updated_at),
+                func.max(Show.updated_at),
+                func.max(other_model.updated_at),
+                select(
+                    func.max(
+                        func.greatest(ShowSeries.updated_at, other_model.updated_at)
+                    )
+                )
+                .select_from(ShowSeries)
+                .join(other_model, other_model.id == series_other_foreign_key)
+                .where(series_foreign_key == entity_id)
+                .correlate(None)
+                .scalar_subquery(),
+            ),
+            func.count(Show.id).filter(Show.start_time < now),
+            func.count(Show.id),
+            select(func.count(ShowSeries.id))
+            .where(series_foreign_key == entity_id)
+            .correlate(None)
+            .scalar_subquery(),
+        )
+        .select_from(model)
+        .outerjoin(Show, foreign_key == model.id)
+        .outerjoin(other_model, other_model.id == other_foreign_key)
+        .filter(model.id == entity_id)
+        .group_by(model.id)
+        .first()
+    )
+    if version is None:
+        return None
+
+    # Occurrences are not stored, so those which have started are counted by expanding
+    # the series up to now
+    started = sum(
+        1
+        for series, *_ in series_in_window(series_foreign_key == entity_id, end=now)
+        for _ in series.occurrences(end=now)
+    )
+    return (*version, started)
+
+
+def venue_version(venue_id):
+    return _detail_version(Venue, Show.venue_id, Artist, Show.artist_id, venue_id)
+
+
+def artist_version(artist_id):
+    return _detail_version(Artist, Show.artist_id, Venue, Show.venue_id, artist_id)
+
+
+def listing_version(model):
+    """
+    Retrieve the version of the list of all venues or artists: when one was last
+    modified, and how many there are, so that deletions are noticed
+    """
+    return db.session.query(func.max(model.updated_at), func.count(model.id)).one()
+
+
+def shows_version():
+    """
+    Retrieve the version of the shows pages: when a show, show series, artist or venue
+    was last modified, and how many shows and show series there are, so that deletions
+    are noticed. Shows are counted from the show counts of venues, which include series
+    occurrences and are adjusted as shows are created and deleted, as counting the rows
+    of the show table would read all of them.
+    """
+    return db.session.query(
+        func.greatest(
+            select(func.max(Show.updated_at)).scalar_subquery(),
+            select(func.max(ShowSeries.updated_at)).scalar_subquery(),
+            select(func.max(Artist.updated_at)).scalar_subquery(),
+            select(func.max(Venue.updated_at)).scalar_subquery(),
+        ),
+        select(
+            func.sum(Venue.upcoming_shows_count + Venue.past_shows_count)
+        ).scalar_subquery(),
+        select(func.count(ShowSeries.id)).scalar_subquery(),
+    ).one()
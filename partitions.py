@@ -0,0 +1,165 @@
+import re
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from models import db, Show, refresh_show_counts
+
+# Shows are range partitioned into a partition for each month of start time, named
+# show_YYYY_MM, and a default partition for shows in months without a partition
+PARTITION_NAME = re.compile(r"show_(\d{4})_(\d{2})")
+DEFAULT_PARTITION = "show_default"
+
+# Prefix given to partitions once they are detached from the show table
+ARCHIVE_PREFIX = "archived_"
+
+
+def _add_months(month, months):
+    """First day of the month a number of months after the given one"""
+    year, month_index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return date(year, month_index + 1, 1)
+
+
+def partition_name(month):
+    return f"show_{month:%Y_%m}"
+
+
+def _double_booking_constraint(partition):
+    return f"{partition}_venue_id_during_excl"
+
+
+def list_partitions():
+    """Months with a partition of the show table, in order"""
+    names = db.session.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = 'show'::regclass"
+        )
+    ).scalars()
+    return sorted(
+        date(int(match[1]), int(match[2]), 1)
+        for match in map(PARTITION_NAME.fullmatch, names)
+        if match
+    )
+
+
+def prevents_double_booking():
+    """Whether the partitions of the show table prevent venues being double booked"""
+    return db.session.execute(
+        text("SELECT EXISTS (SELECT FROM pg_constraint WHERE conname = :name)"),
+        {"name": _double_booking_constraint(DEFAULT_PARTITION)},
+    ).scalar()
+
+
+def prevent_double_booking(partition):
+    """
+    Add an exclusion constraint preventing shows at the same venue from overlapping to
+    a partition. Exclusion constraints cannot be added to a partitioned table, so shows
+    are only compared with the other shows starting in the same month.
+
+    The venue id is compared as a single value range, so that the constraint can use
+    the built-in GiST operator class for ranges rather than the btree_gist extension.
+    """
+    db.session.execute(
+        text(
+            f"ALTER TABLE {partition} "
+            f"ADD CONSTRAINT {_double_booking_constraint(partition)} "
+            "EXCLUDE USING gist "
+            "(int4range(venue_id, venue_id, '[]') WITH =, during WITH &&)"
+        )
+    )
+
+
+def allow_double_booking(partition):
+    """Remove the exclusion constraint preventing double bookings from a partition"""
+    db.session.execute(
+        text(
+            f"ALTER TABLE {partition} "
+            f"DROP CONSTRAINT IF EXISTS {_double_booking_constraint(partition)}"
+        )
+    )
+
+
+def create_partition(month):
+    """
+    Create the partition for the shows starting in a month. The partition is created
+    separately, moving in any of its shows from the default partition, and attached
+    once it holds them, as a partition cannot be created while the default partition
+    holds shows belonging to it.
+    """
+    name = partition_name(month)
+    columns = ", ".join(
+        column.name for column in Show.__table__.columns if column.computed is None
+    )
+    start, end = month.isoformat(), _add_months(month, 1).isoformat()
+
+    db.session.execute(
+        text(
+            f"CREATE TABLE {name} (LIKE show "
+            "INCLUDING CONSTRAINTS INCLUDING DEFAULTS INCLUDING GENERATED)"
+        )
+    )
+    db.session.execute(
+        text(
+            f"WITH moved AS ("
+            f"DELETE FROM {DEFAULT_PARTITION} "
+            f"WHERE start_time >= '{start}' AND start_time < '{end}' "
+            f"RETURNING {columns}"
+            f") INSERT INTO {name} ({columns}) SELECT {columns} FROM moved"
+        )
+    )
+    if prevents_double_booking():
+        prevent_double_booking(name)
+    db.session.execute(
+        text(
+            f"ALTER TABLE show ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+    )
+
+
+def create_partitions(months_ahead=12):
+    """
+    Create any missing partitions for the current month and the given number of months
+    ahead, and for the months of any shows in the default partition, which would
+    otherwise be read by every query. Returns the months created.
+    """
+    this_month = datetime.now().date().replace(day=1)
+    months = {_add_months(this_month, months) for months in range(months_ahead + 1)}
+    months.update(
+        db.session.execute(
+            text(
+                f"SELECT DISTINCT date_trunc('month', start_time)::date "
+                f"FROM {DEFAULT_PARTITION}"
+            )
+        ).scalars()
+    )
+
+    created = sorted(months - set(list_partitions()))
+    for month in created:
+        create_partition(month)
+
+    db.session.commit()
+    return created
+
+
+def detach_partitions(months_kept):
+    """
+    Detach the partitions for months before the given number of months ago from the show
+    table, returning the months detached. Detached partitions are kept as archived_show_
+    tables, so their shows can be restored or exported, but they are no longer listed.
+    """
+    first_kept = _add_months(datetime.now().date().replace(day=1), -months_kept)
+    detached = [month for month in list_partitions() if month < first_kept]
+    for month in detached:
+        name = partition_name(month)
+        db.session.execute(text(f"ALTER TABLE show DETACH PARTITION {name}"))
+        db.session.execute(text(f"ALTER TABLE {name} RENAME TO {ARCHIVE_PREFIX}{name}"))
+
+    db.session.commit()
+    # Detached shows no longer count towards the past shows of venues and artists
+    if detached:
+        refresh_show_counts()
+
+    return detached
@@ -0,0 +1,108 @@
+import random
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context, request
+from flask_sqlalchemy import SignallingSession, SQLAlchemy, get_state
+from sqlalchemy import orm
+
+# Cookie marking a client which recently submitted a form, and so should read from
+# the primary database until its changes have reached the replicas
+STICKY_COOKIE = "fyyur_primary"
+
+
+class RoutingSession(SignallingSession):
+    """
+    Session which sends queries to the read replica chosen for the current request, if
+    any, and flushes and all other queries to the primary database
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        replica = g.get("replica_bind") if has_app_context() else None
+        if replica is not None and not self._flushing:
+            return get_state(self.app).db.get_engine(self.app, bind=replica)
+
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy extension using a RoutingSession"""
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def read_only(view):
+    """Mark a view as only reading from the database, so it may query a read replica"""
+    view.read_only = True
+    return view
+
+
+class ReadReplicas:
+    """
+    Routes the queries of read-only views to a randomly chosen read replica, configured
+    by SQLALCHEMY_REPLICA_URIS. Clients are kept on the primary database for
+    REPLICA_STICKINESS seconds after submitting a form, so they read their own writes.
+    """
+
+    def __init__(self, app=None):
+        self.bind_keys = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("SQLALCHEMY_REPLICA_URIS", [])
+        app.config.setdefault("REPLICA_STICKINESS", 10)
+
+        replica_uris = app.config["SQLALCHEMY_REPLICA_URIS"]
+        if not replica_uris:
+            return
+
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        for i, uri in enumerate(replica_uris):
+            binds[f"replica_{i}"] = uri
+        app.config["SQLALCHEMY_BINDS"] = binds
+        self.bind_keys = [f"replica_{i}" for i in range(len(replica_uris))]
+
+        app.before_request(self._choose_bind)
+        app.after_request(self._stick_to_primary)
+
+    def lag(self):
+        """
+        Number of seconds the data read by the current request may be behind the primary
+        database, as the replicas are assumed to catch up within REPLICA_STICKINESS
+        """
+        if has_app_context() and g.get("replica_bind") is not None:
+            return current_app.config["REPLICA_STICKINESS"]
+        return 0
+
+    @contextmanager
+    def primary(self):
+        """
+        Send the queries of the current request to the primary database within the
+        block, such as those filling a cache shared with other clients, which must not
+        be filled with data a replica has yet to catch up on
+        """
+        replica = g.pop("replica_bind", None) if has_app_context() else None
+        try:
+            yield
+        finally:
+            if replica is not None:
+                g.replica_bind = replica
+
+    def _choose_bind(self):
+        view = current_app.view_functions.get(request.endpoint)
+        if getattr(view, "read_only", False) and STICKY_COOKIE not in request.cookies:
+            g.replica_bind = random.choice(self.bind_keys)
+
+    def _stick_to_primary(self, response):
+        view = current_app.view_functions.get(request.endpoint)
+        if request.method == "POST" and not getattr(view, "read_only", False):
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=current_app.config["REPLICA_STICKINESS"],
+                httponly=True,
+                samesite="Lax",
+            )
+
+        return response
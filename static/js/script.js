@@ -2,3 +2,29 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Fill the datalist of a search box with typeahead suggestions as the user types
+document.querySelectorAll("input[data-suggest]").forEach(function (input) {
+  var datalist = document.getElementById(input.getAttribute("list"));
+  input.addEventListener("input", function () {
+    var query = input.value.trim();
+    if (!query) {
+      return;
+    }
+    fetch("/search/suggest?q=" + encodeURIComponent(query))
+      .then(function (response) {
+        return response.json();
+      })
+      .then(function (suggestions) {
+        if (input.value.trim() !== query) {
+          return;
+        }
+        datalist.innerHTML = "";
+        suggestions[input.dataset.suggest].forEach(function (suggestion) {
+          var option = document.createElement("option");
+          option.value = suggestion.name;
+          datalist.appendChild(option);
+        });
+      });
+  });
+});
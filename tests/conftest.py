@@ -0,0 +1,82 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import app as fyyur_app, cache, fragment_cache
+from models import db, Artist, Venue
+
+
+@pytest.fixture
+def app():
+    """
+    The application, connected to the configured database. Tests which use it are
+    skipped if the database is not running.
+    """
+    fyyur_app.config.update(TESTING=True, REPLICA_STICKINESS=0)
+    with fyyur_app.app_context():
+        try:
+            db.session.execute(text("SELECT 1"))
+        except OperationalError:
+            pytest.skip("The database is not running")
+        finally:
+            db.session.remove()
+
+        cache.clear()
+        fragment_cache.backend.clear()
+        yield fyyur_app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def venue(app):
+    """
+    The id and name of a venue listed for the test, removed along with its shows
+    afterwards
+    """
+    venue = Venue(
+        name=f"Test Venue {uuid.uuid4().hex[:8]}",
+        city="Testville",
+        state="CA",
+        address="1 Test Street",
+        phone="123-456-7890",
+        genres=["Jazz"],
+    )
+    db.session.add(venue)
+    db.session.commit()
+    venue_id = venue.id
+    yield SimpleNamespace(id=venue_id, name=venue.name)
+
+    db.session.rollback()
+    db.session.execute(text("DELETE FROM venue WHERE id = :id"), {"id": venue_id})
+    db.session.commit()
+
+
+@pytest.fixture
+def artist(app):
+    """
+    The id and name of an artist listed for the test, removed along with their shows
+    afterwards
+    """
+    artist = Artist(
+        name=f"Test Artist {uuid.uuid4().hex[:8]}",
+        city="Testville",
+        state="CA",
+        phone="123-456-7890",
+        genres=["Jazz"],
+    )
+    db.session.add(artist)
+    db.session.commit()
+    artist_id = artist.id
+    yield SimpleNamespace(id=artist_id, name=artist.name)
+
+    db.session.rollback()
+    db.session.execute(text("DELETE FROM artist WHERE id = :id"), {"id": artist_id})
+    db.session.commit()
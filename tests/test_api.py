@@ -0,0 +1,46 @@
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import api
+from api import VENUE_FIELDS, encode, parse_fields, project, serialize
+
+
+def test_parse_fields():
+    assert parse_fields(None, VENUE_FIELDS) == list(VENUE_FIELDS)
+    assert parse_fields("name, city,name", VENUE_FIELDS) == ["name", "city"]
+
+
+def test_parse_unknown_fields():
+    with pytest.raises(ValueError, match="Unknown fields: password"):
+        parse_fields("name,password", VENUE_FIELDS)
+
+
+def test_project_includes_required_fields_once():
+    assert project(["name", "id"], VENUE_FIELDS, required=["id"]) == [
+        VENUE_FIELDS["id"],
+        VENUE_FIELDS["name"],
+    ]
+
+
+def test_serialize():
+    rows = [SimpleNamespace(id=1, name="The Musical Hop", city="San Francisco")]
+    assert serialize(rows, ["name", "id"], VENUE_FIELDS) == [
+        {"name": "The Musical Hop", "id": 1}
+    ]
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_encode(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(api, "orjson", None)
+    elif api.orjson is None:
+        pytest.skip("orjson is not installed")
+
+    body = encode({"start_time": datetime(2035, 1, 5, 20, 0), "genres": ["Jazz"]})
+    assert json.loads(body) == {
+        "start_time": "2035-01-05T20:00:00",
+        "genres": ["Jazz"],
+    }
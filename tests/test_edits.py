@@ -0,0 +1,82 @@
+from sqlalchemy import event
+
+from models import db, Venue, update_if_current
+
+
+def _version(venue_id):
+    db.session.rollback()
+    return db.session.get(Venue, venue_id).version
+
+
+def _edit(client, venue, version, **changes):
+    data = {
+        "name": venue.name,
+        "city": "Testville",
+        "state": "CA",
+        "address": "1 Test Street",
+        "phone": "123-456-7890",
+        "genres": ["Jazz"],
+        "version": version,
+        **changes,
+    }
+    return client.post(f"/venues/{venue.id}/edit", data=data)
+
+
+def test_update_if_current_updates_changed_values(venue):
+    version = _version(venue.id)
+    assert update_if_current(Venue, venue.id, version, {"city": "Edited"}) == (
+        False,
+        True,
+    )
+    db.session.commit()
+    assert _version(venue.id) == version + 1
+
+
+def test_update_if_current_skips_unchanged_values(venue):
+    version = _version(venue.id)
+    assert update_if_current(Venue, venue.id, version, {"city": "Testville"}) == (
+        False,
+        False,
+    )
+    db.session.commit()
+    assert _version(venue.id) == version
+
+
+def test_update_if_current_only_sets_changed_columns(venue):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    version = _version(venue.id)
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        values = {"city": "Edited", "phone": "123-456-7890", "genres": ["Jazz"]}
+        assert update_if_current(Venue, venue.id, version, values) == (False, True)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    db.session.commit()
+
+    (update,) = [s for s in statements if s.startswith("UPDATE")]
+    assert "city=" in update
+    assert "phone" not in update
+    assert "genres" not in update
+
+
+def test_update_if_current_detects_conflicts(venue):
+    version = _version(venue.id)
+    assert update_if_current(Venue, venue.id, version - 1, {"city": "Edited"}) == (
+        True,
+        False,
+    )
+    assert update_if_current(Venue, 0, version, {"city": "Edited"}) is None
+
+
+def test_edit_conflict(client, venue):
+    version = _version(venue.id)
+    assert _edit(client, venue, version, city="First").status_code == 302
+
+    response = _edit(client, venue, version, city="Second")
+    assert response.status_code == 409
+    db.session.rollback()
+    assert db.session.get(Venue, venue.id).city == "First"
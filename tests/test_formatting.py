@@ -0,0 +1,17 @@
+from datetime import datetime
+
+import pytest
+
+from formatting import _format_legacy, format_datetime
+
+
+@pytest.mark.parametrize("format", ["full", "medium", "yyyy-MM-dd"])
+def test_format_datetime_matches_the_previous_implementation(format):
+    value = datetime(2035, 1, 5, 20, 30)
+    assert format_datetime(value, format) == _format_legacy(value, format)
+
+
+def test_format_datetime_parses_strings():
+    assert format_datetime("2035-01-05 20:30:00", "full") == (
+        "Friday January, 5, 2035 at 8:30PM"
+    )
@@ -0,0 +1,22 @@
+from models import db, ShowSeries
+
+
+def test_page_is_invalidated_by_a_series_without_listed_occurrences(
+    client, venue, artist
+):
+    series = ShowSeries(
+        venue_id=venue.id,
+        artist_id=artist.id,
+        start_time="2035-01-05 20:00",
+        recurrence="FREQ=WEEKLY;COUNT=1",
+    )
+    series.update_period()
+    db.session.add(series)
+    db.session.commit()
+    occurrence = f"/series/{series.id}/2035-01-05T20:00:00"
+
+    client.post(occurrence)
+    assert "0 Upcoming Shows" in client.get(f"/venues/{venue.id}").get_data(True)
+
+    client.post(occurrence, data={"start_time": "2035-01-06 20:00"})
+    assert "1 Upcoming Show" in client.get(f"/venues/{venue.id}").get_data(True)
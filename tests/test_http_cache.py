@@ -0,0 +1,49 @@
+from models import db, Show
+
+
+def _add_shows(venue, artist, *start_times):
+    shows = [
+        Show(venue_id=venue.id, artist_id=artist.id, start_time=start_time)
+        for start_time in start_times
+    ]
+    db.session.add_all(shows)
+    db.session.commit()
+    return [show.id for show in shows]
+
+
+def _delete_show(show_id):
+    db.session.delete(db.session.get(Show, show_id))
+    db.session.commit()
+
+
+def test_unchanged_page_is_not_modified(client, venue):
+    response = client.get(f"/venues/{venue.id}")
+    assert response.status_code == 200
+    assert response.headers["ETag"]
+    assert "Last-Modified" not in response.headers
+    assert "Cookie" in response.headers["Vary"]
+
+    response = client.get(
+        f"/venues/{venue.id}", headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert response.status_code == 304
+
+
+def test_page_is_modified_by_deleting_an_older_show(client, venue, artist):
+    older, _ = _add_shows(venue, artist, "2035-01-01 20:00", "2035-02-01 20:00")
+
+    for url in (f"/venues/{venue.id}", f"/artists/{artist.id}", "/shows"):
+        etag = client.get(url).headers["ETag"]
+        db.session.remove()
+        _delete_show(older)
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200, url
+        (older,) = _add_shows(venue, artist, "2035-01-01 20:00")
+
+
+def test_clients_with_a_session_are_sent_private_responses(client, venue):
+    client.set_cookie("localhost", "session", "value")
+    response = client.get(f"/venues/{venue.id}")
+    assert response.status_code == 200
+    assert "private" in response.headers["Cache-Control"]
+    assert "Cookie" in response.headers["Vary"]
@@ -0,0 +1,23 @@
+from importer import import_file
+
+
+def test_rejected_rows(app):
+    rejected = []
+    stats = import_file(
+        "shows",
+        [
+            {"artist_id": "1", "venue_id": "1", "start_time": "soon", "duration": "60"},
+            {
+                "artist_id": "-1",
+                "venue_id": "-1",
+                "start_time": "2035-01-05 20:00:00",
+                "duration": "60",
+            },
+        ],
+        on_reject=lambda line, errors: rejected.append((line, errors)),
+    )
+
+    assert (stats.imported, stats.rejected) == (0, 2)
+    assert [line for line, _ in rejected] == [1, 2]
+    assert "start_time" in rejected[0][1]
+    assert rejected[1][1] == {"show": ["Artist or venue does not exist."]}
@@ -0,0 +1,63 @@
+import time
+
+import pytest
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from instrumentation import RepeatedStatementError, RequestQueryStats, fingerprint
+from models import db
+
+
+def test_fingerprint_replaces_parameters_and_literals():
+    assert (
+        fingerprint(
+            "SELECT * FROM venue WHERE id = %(id_1)s AND name = 'It''s' LIMIT 10"
+        )
+        == "SELECT * FROM venue WHERE id = ? AND name = ? LIMIT ?"
+    )
+
+
+def test_fingerprint_collapses_lists_and_whitespace():
+    assert fingerprint("SELECT *\n  FROM show WHERE id IN (%s, %s, 3)") == (
+        "SELECT * FROM show WHERE id IN (?)"
+    )
+
+
+def test_repeated_statements():
+    stats = RequestQueryStats()
+    for i in range(3):
+        stats.record(f"SELECT * FROM artist WHERE id = {i}", 0.001)
+    stats.record("SELECT * FROM venue", 0.001)
+
+    assert stats.count == 4
+    assert stats.repeated(2) == {"SELECT * FROM artist WHERE id = ?": 3}
+    assert stats.repeated(3) == {}
+
+
+def test_failed_statements_do_not_skew_later_timings(app):
+    with app.test_request_context("/"):
+        app.preprocess_request()
+        with pytest.raises(ProgrammingError):
+            db.session.execute(text("SELECT * FROM no_such_table"))
+        db.session.rollback()
+
+        start = time.perf_counter()
+        db.session.execute(text("SELECT 1"))
+        elapsed = time.perf_counter() - start
+        db.session.rollback()
+
+        assert g.query_stats.duration <= elapsed
+
+
+def test_strict_mode_raises_on_repeated_statements(app):
+    app.config.update(SQL_STRICT=True, SQL_REPEATED_STATEMENT_LIMIT=2)
+    try:
+        with app.test_request_context("/"):
+            app.preprocess_request()
+            with pytest.raises(RepeatedStatementError):
+                for i in range(3):
+                    db.session.execute(text(f"SELECT {i}"))
+            db.session.rollback()
+    finally:
+        app.config.update(SQL_STRICT=False, SQL_REPEATED_STATEMENT_LIMIT=10)
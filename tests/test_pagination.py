@@ -0,0 +1,27 @@
+from datetime import datetime
+
+import pytest
+from werkzeug.exceptions import BadRequest
+
+from app import _decode_cursor, _encode_cursor
+
+
+def test_cursor_round_trip():
+    cursor = _encode_cursor(datetime(2035, 1, 5, 20, 0), 42)
+    assert _decode_cursor(cursor, datetime.fromisoformat, int) == [
+        datetime(2035, 1, 5, 20, 0),
+        42,
+    ]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        _encode_cursor(42),
+        _encode_cursor("yesterday", 42),
+    ],
+)
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(BadRequest):
+        _decode_cursor(cursor, datetime.fromisoformat, int)
@@ -0,0 +1,23 @@
+from flask import g
+
+from app import replicas
+
+
+def test_primary_routes_queries_to_the_primary_within_the_block(app, monkeypatch):
+    monkeypatch.setitem(app.config, "REPLICA_STICKINESS", 10)
+    with app.test_request_context("/"):
+        g.replica_bind = "replica_0"
+        assert replicas.lag() == 10
+
+        with replicas.primary():
+            assert g.get("replica_bind") is None
+            assert replicas.lag() == 0
+
+        assert g.replica_bind == "replica_0"
+
+
+def test_primary_without_a_replica(app):
+    with app.test_request_context("/"):
+        with replicas.primary():
+            assert g.get("replica_bind") is None
+        assert g.get("replica_bind") is None
@@ -0,0 +1,54 @@
+from models import db, Artist, ShowSeries, Venue, refresh_show_counts
+from exporter import export_rows
+
+
+def _counts(model, entity_id):
+    db.session.rollback()
+    entity = db.session.get(model, entity_id)
+    return entity.upcoming_shows_count, entity.past_shows_count
+
+
+def _create_series(client, venue, artist, recurrence="FREQ=WEEKLY;COUNT=5"):
+    response = client.post(
+        "/shows/create",
+        data={
+            "venue_id": venue.id,
+            "artist_id": artist.id,
+            "start_time": "2035-01-05 20:00:00",
+            "recurrence": recurrence,
+        },
+    )
+    assert response.status_code == 302
+    return ShowSeries.query.filter_by(venue_id=venue.id).one()
+
+
+def test_series_occurrences_are_counted(client, venue, artist):
+    venue_id, artist_id = venue.id, artist.id
+    series = _create_series(client, venue, artist)
+    assert _counts(Venue, venue_id) == (5, 0)
+    assert _counts(Artist, artist_id) == (5, 0)
+
+    client.post(f"/series/{series.id}/2035-01-12T20:00:00")
+    assert _counts(Venue, venue_id) == (4, 0)
+    assert _counts(Artist, artist_id) == (4, 0)
+
+    refresh_show_counts()
+    assert _counts(Venue, venue_id) == (4, 0)
+    assert _counts(Artist, artist_id) == (4, 0)
+
+
+def test_series_occurrences_are_uncounted_when_deleted(client, venue, artist):
+    artist_id = artist.id
+    _create_series(client, venue, artist)
+
+    client.post(f"/venues/{venue.id}")
+    assert _counts(Artist, artist_id) == (0, 0)
+
+
+def test_series_occurrences_are_exported(client, venue, artist):
+    series = _create_series(client, venue, artist)
+
+    occurrences = [row for row in export_rows("shows") if row["series_id"] == series.id]
+    assert len(occurrences) == 5
+    assert all(row["id"] is None for row in occurrences)
+    assert occurrences[0]["venue_name"] == venue.name
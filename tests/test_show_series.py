@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+from models import ShowSeries, ShowSeriesException
+
+
+def _series(*exceptions):
+    series = ShowSeries(
+        start_time=datetime(2035, 1, 5, 20, 0),
+        recurrence="FREQ=WEEKLY;COUNT=4",
+        duration=120,
+    )
+    series.exceptions = list(exceptions)
+    return series
+
+
+def test_occurrences():
+    start_times = [start for start, _, _ in _series().occurrences()]
+    assert start_times == [
+        datetime(2035, 1, 5, 20, 0) + timedelta(weeks=i) for i in range(4)
+    ]
+
+
+def test_occurrences_in_a_window():
+    occurrences = _series().occurrences(
+        start=datetime(2035, 1, 12, 20, 0), end=datetime(2035, 1, 26, 20, 0)
+    )
+    assert [start for start, _, _ in occurrences] == [
+        datetime(2035, 1, 12, 20, 0),
+        datetime(2035, 1, 19, 20, 0),
+    ]
+
+
+def test_cancelled_and_rescheduled_occurrences():
+    series = _series(
+        ShowSeriesException(occurrence=datetime(2035, 1, 12, 20, 0), cancelled=True),
+        # Moved past the next occurrence, and shortened
+        ShowSeriesException(
+            occurrence=datetime(2035, 1, 19, 20, 0),
+            cancelled=False,
+            start_time=datetime(2035, 1, 27, 18, 0),
+            duration=60,
+        ),
+        ShowSeriesException(
+            occurrence=datetime(2035, 1, 26, 20, 0), cancelled=False, duration=90
+        ),
+    )
+
+    assert list(series.occurrences()) == [
+        (datetime(2035, 1, 5, 20, 0), 120, datetime(2035, 1, 5, 20, 0)),
+        (datetime(2035, 1, 26, 20, 0), 90, datetime(2035, 1, 26, 20, 0)),
+        (datetime(2035, 1, 27, 18, 0), 60, datetime(2035, 1, 19, 20, 0)),
+    ]
+
+
+def test_rescheduled_occurrences_follow_their_new_start_time():
+    series = _series(
+        ShowSeriesException(
+            occurrence=datetime(2035, 1, 5, 20, 0),
+            cancelled=False,
+            start_time=datetime(2035, 2, 1, 20, 0),
+        )
+    )
+
+    assert list(series.occurrences(end=datetime(2035, 1, 20))) == [
+        (datetime(2035, 1, 12, 20, 0), 120, datetime(2035, 1, 12, 20, 0)),
+        (datetime(2035, 1, 19, 20, 0), 120, datetime(2035, 1, 19, 20, 0)),
+    ]
+    assert list(series.occurrences(start=datetime(2035, 1, 27)))[-1] == (
+        datetime(2035, 2, 1, 20, 0),
+        120,
+        datetime(2035, 1, 5, 20, 0),
+    )
+
+
+def test_show_counts():
+    now = datetime(2035, 1, 15)
+    assert _series().show_counts(days_ahead=7, now=now) == (1, 2)
+    assert _series().show_counts(days_ahead=30, now=now) == (2, 2)
@@ -0,0 +1,57 @@
+from models import db, Show, ShowSeries
+
+
+def _series(
+    venue, artist, start_time="2035-01-05 20:00", recurrence="FREQ=WEEKLY;COUNT=5"
+):
+    series = ShowSeries(
+        venue_id=venue.id,
+        artist_id=artist.id,
+        start_time=start_time,
+        recurrence=recurrence,
+    )
+    series.update_period()
+    db.session.add(series)
+    db.session.commit()
+    return series
+
+
+def test_show_pages_with_a_time_zone_and_cursor(client, venue, artist):
+    _series(venue, artist)
+    db.session.add(
+        Show(venue_id=venue.id, artist_id=artist.id, start_time="2035-01-06")
+    )
+    db.session.commit()
+
+    start_times = []
+    url = f"/api/v1/venues/{venue.id}/shows?from=2035-01-01T00:00%2B00:00&limit=2"
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        start_times += [show["start_time"] for show in response.json["data"]]
+        url = response.json["next"]
+
+    assert len(start_times) == 6
+    assert start_times == sorted(start_times)
+
+
+def test_shows_page_with_a_time_zone_and_cursor(client, venue, artist):
+    _series(venue, artist)
+
+    response = client.get("/shows?from=2035-01-01T00:00%2B00:00")
+    assert response.status_code == 200
+
+    response = client.get("/api/v1/shows?from=2035-01-01T00:00%2B00:00&limit=1")
+    assert response.json["next"]
+    response = client.get(response.json["next"])
+    assert response.status_code == 200
+
+
+def test_available_venues_with_a_time_zone(client, venue, artist):
+    _series(venue, artist)
+
+    response = client.get(
+        "/venues/available?city=Testville&state=CA"
+        "&from=2035-01-05T21:00%2B00:00&to=2035-01-05T22:00%2B00:00"
+    )
+    assert response.status_code == 200
@@ -0,0 +1,19 @@
+from sqlalchemy import text
+
+from models import db
+
+
+def _statement_timeout():
+    timeout = db.session.execute(text("SHOW statement_timeout")).scalar()
+    db.session.rollback()
+    return timeout
+
+
+def test_requests_have_a_statement_timeout(app, monkeypatch):
+    monkeypatch.setitem(app.config, "SQL_STATEMENT_TIMEOUT", "5s")
+    with app.test_request_context("/"):
+        assert _statement_timeout() == "5s"
+
+
+def test_commands_have_no_statement_timeout(app):
+    assert _statement_timeout() == "0"